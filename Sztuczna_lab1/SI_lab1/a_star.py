@@ -1,68 +1,19 @@
 import datetime
 import time
 
-import pandas as pd
-
-from structures_functions import Graph, time_diff, a_star_time, reconstruct_path, a_star_lines
+from graph_loader import load_graph
+from landmarks import load_landmarks
+from raptor import raptor_search
+from structures_functions import a_star_time, reconstruct_path, format_time, a_star_lines_route, SearchStats
 
 if __name__ == '__main__':
-    df = pd.read_csv(
-        'connection_graph.csv',
-        parse_dates=['departure_time', 'arrival_time'],
-        date_parser=lambda x: pd.to_datetime(x, format='%H:%M:%S').time
-    )
-
-    """
-        Reading from file:
-        [0] - Unnamed
-        [1] - ID
-        [2] - Company
-        [3] - Line
-        [4, 5] - time from /to
-        [6, 7] - start / end stop
-        [8, 9] - width / height start stop
-        [10, 11] - width / height end stop
-    """
-
-    city_map = Graph()
-
-    for row in df.values:
-        stop_from = str(row[6]).lower()
-        from_w_h = row[8], row[9]
-
-        stop_to = str(row[7]).lower()
-
-        if stop_from in city_map.verticles.keys():
-            city_map.verticles[stop_from].append(stop_to)
-        else:
-            city_map.verticles[stop_from] = [stop_to]
-            city_map.width_height[stop_from] = from_w_h
-
-        edge = row[4], time_diff(row[5], row[4]), row[3], row[5]
-        if (stop_from, stop_to) in city_map.edges.keys():
-            city_map.edges[(stop_from, stop_to)].append(edge)
-        else:
-            city_map.edges[(stop_from, stop_to)] = [edge]
-
-    """
-    Example data:
-    [('krzyki', 'sowia)] -> [
-        (datetime.time(17, 3), 1, 'A', datetime(17, 4))
-        (datetime.time(17, 18), 1, 'A', dateime(17, 19))
-        (datetime.time(17, 16), 2, 'D', datetime(17, 17)
-        etc.
-    ]
-    """
-
-    """
-        Sorting by time
-    """
-    for r in city_map.edges.values():
-        r.sort(key=lambda x: x[0])
+    city_map = load_graph()
+    landmarks = load_landmarks(city_map)
 
     """
         Exercise 2 - A* algorithm by time
     """
+    stats = SearchStats()
     start_time = time.time()
 
     values = ('grota-roweckiego', 'pl. grunwaldzki', datetime.time(12, 15, 0))
@@ -71,7 +22,9 @@ if __name__ == '__main__':
         city_map,
         values[0],
         values[1],
-        values[2]
+        values[2],
+        landmarks,
+        stats
     )
     end_time = time.time()
 
@@ -79,20 +32,47 @@ if __name__ == '__main__':
     result = zip(stops, lines)
 
     print("Route")
-    for route_part in result:
-        print('      - ' + str(route_part))
+    for stop, (line, departure, arrival) in result:
+        print('      - ' + stop + ': ' + line + ' ' + format_time(departure) + ' -> ' + format_time(arrival))
 
-    print('Czas przejazdu: ' + str(cost[values[1]]) + ' [min]')
-    print('Czas działania programu: ' + str(round(end_time - start_time, 2)) + ' [s]\n')
+    print('Czas przejazdu: ' + str(cost[values[1]] // 60) + ' [min]')
+    print('Czas działania programu: ' + str(round(end_time - start_time, 2)) + ' [s]')
+    print('Statystyki wyszukiwania: ' + str(stats) + '\n')
 
     """
             Exercise 3 - A* algorithm by lines
     """
+    stats = SearchStats()
     start_time = time.time()
 
     values = ('grota-roweckiego', 'pl. grunwaldzki', datetime.time(16, 18, 0))
 
-    came_from, cost = a_star_lines(
+    route = a_star_lines_route(
+        city_map,
+        values[0],
+        values[1],
+        values[2],
+        landmarks,
+        stats
+    )
+    end_time = time.time()
+
+    print("Route")
+    for leg in route.legs():
+        print('      - ' + leg.from_stop + ' -> ' + leg.to_stop + ': ' + leg.line + ' ' +
+              format_time(leg.departure) + ' -> ' + format_time(leg.arrival))
+
+    print('Czas przejazdu: ' + str(route.travel_time // 60) + ' min')
+    print('Czas działania ' + str(round(end_time - start_time, 2)) + ' [s]')
+    print('Ilość przesiadek: ' + str(route.transfers))
+    print('Statystyki wyszukiwania: ' + str(stats))
+
+    """
+            Exercise 3 - RAPTOR, every (travel time, transfers) trade-off at once
+    """
+    start_time = time.time()
+
+    journeys = raptor_search(
         city_map,
         values[0],
         values[1],
@@ -100,14 +80,14 @@ if __name__ == '__main__':
     )
     end_time = time.time()
 
-    stops, lines = reconstruct_path(came_from, values[0], values[1])
-    amount_of_lines = len(list(set(map(lambda l: l[0], lines[1:len(lines) - 1]))))
-    result = zip(stops, lines)
+    for travel_time, transfers, came_from in journeys:
+        stops, lines = reconstruct_path(came_from, values[0], values[1])
+        result = zip(stops, lines)
 
-    print("Route")
-    for route_part in result:
-        print('      - ' + str(route_part))
+        print("Route")
+        for stop, (line, departure, arrival) in result:
+            print('      - ' + stop + ': ' + line + ' ' + format_time(departure) + ' -> ' + format_time(arrival))
 
-    print('Czas przejazdu: ' + str(cost[values[1]] - 600 * amount_of_lines) + ' min')
+        print('Czas przejazdu: ' + str(travel_time // 60) + ' min')
+        print('Ilość przesiadek: ' + str(transfers))
     print('Czas działania ' + str(round(end_time - start_time, 2)) + ' [s]')
-    print('Ilość przesiadek: ' + str(amount_of_lines - 1))
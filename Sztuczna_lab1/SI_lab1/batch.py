@@ -0,0 +1,124 @@
+import argparse
+import csv
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from bidirectional import bidirectional_route
+from connection_scan import csa_route
+from graph_loader import load_graph, CSV_FILE, CACHE_DIR
+from structures_functions import Graph, dijkstra_route, a_star_time_route, a_star_lines_route, parse_time
+
+"""
+    Batch mode: many queries against one loaded graph, results streamed as JSON lines.
+
+    Queries file (csv with header, criterion is optional):
+        origin,destination,departure_time,criterion
+        grota-roweckiego,pl. grunwaldzki,12:15,time
+
+    python batch.py queries.csv --workers 8 > results.jsonl
+
+    A result has the route as legs ridden on one line each, travel_time is in seconds:
+        {"origin": ..., "arrival_time": "12:31", "travel_time": 960, "transfers": 1,
+         "legs": [{"line": "A", "from": ..., "to": ..., "departure": "12:17", "arrival": "12:24", "rides": 4}, ...]}
+"""
+
+SEARCHES = {
+    'time': dijkstra_route,
+    'a_star_time': a_star_time_route,
+    'lines': a_star_lines_route,
+    'csa': csa_route,
+    'bidirectional': bidirectional_route
+}
+
+worker_graph: Optional[Graph] = None
+
+
+def init_worker(csv_path: str, cache_dir: str):
+    global worker_graph
+    worker_graph = load_graph(csv_path, cache_dir)
+
+
+def read_queries(path: str, criterion: str):
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield (
+                row['origin'].strip().lower(),
+                row['destination'].strip().lower(),
+                row['departure_time'].strip(),
+                (row.get('criterion') or criterion).strip()
+            )
+
+
+def run_query(query: (str, str, str, str), graph: Optional[Graph] = None) -> dict:
+    if graph is None:
+        graph = worker_graph
+    origin, destination, departure_time, criterion = query
+    result = {
+        'origin': origin,
+        'destination': destination,
+        'departure_time': departure_time,
+        'criterion': criterion
+    }
+
+    if criterion not in SEARCHES:
+        result['error'] = 'unknown criterion'
+        return result
+    try:
+        now = parse_time(departure_time)
+    except ValueError:
+        result['error'] = 'bad departure time'
+        return result
+
+    route = SEARCHES[criterion](graph, origin, destination, now)
+    if route is None:
+        result['error'] = 'no route'
+        return result
+
+    route_result = route.to_dict()
+    del route_result['departure_time']  # already there, as given in the query
+    result.update(route_result)
+    return result
+
+
+def run_batch(queries, graph: Graph, workers: int, csv_path: str, cache_dir: str):
+    """
+        Yields results in the order of queries.
+        With more than one worker, every worker loads the graph from cache once.
+    """
+    if workers <= 1:
+        for query in queries:
+            yield run_query(query, graph)
+        return
+
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(csv_path, cache_dir)) as pool:
+        yield from pool.map(run_query, queries, chunksize=64)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run many route queries against one graph.')
+    parser.add_argument('queries', help='csv file: origin,destination,departure_time[,criterion]')
+    parser.add_argument('-o', '--output', help='JSON lines output file (default: stdout)')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='worker processes (default: 1)')
+    parser.add_argument('-c', '--criterion', default='time', choices=sorted(SEARCHES),
+                        help='criterion for queries without one (default: time)')
+    parser.add_argument('--csv', default=CSV_FILE, help='connection graph csv file')
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help='graph cache directory')
+    args = parser.parse_args(argv)
+
+    # Loading here also makes sure the workers find the graph in cache
+    city_map = load_graph(args.csv, args.cache_dir)
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        queries = read_queries(args.queries, args.criterion)
+        for result in run_batch(queries, city_map, args.workers, args.csv, args.cache_dir):
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
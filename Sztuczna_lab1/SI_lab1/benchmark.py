@@ -0,0 +1,230 @@
+import argparse
+import json
+import math
+import random
+import sys
+import time
+import tracemalloc
+
+from structures_functions import Graph, SearchStats, LegCache, dijkstra_search, a_star_time, a_star_lines, \
+    one_to_all, tabu_search
+
+"""
+    Benchmark of the lab 1 searches on a synthetic timetable, results as JSON:
+        - synthetic_graph   - stops around Wrocław, lines as walks between near stops,
+                              each one starting at a stop of the lines before,
+                              trips both ways from 5:00 to 23:00
+        - query_set         - fixed (origin, destination, departure) queries for a seed
+
+    python benchmark.py --stops 500 --lines 60 --trips 80 > benchmark.json
+"""
+
+LATITUDE = 51.05, 51.17
+LONGITUDE = 16.90, 17.15
+SPEED = 400 / 60  # [m/s], about 24 km/h
+FIRST_DEPARTURE = 5 * 3600
+LAST_DEPARTURE = 23 * 3600
+
+
+def synthetic_graph(stops: int, lines: int, trips: int, seed: int = 0, line_length: (int, int) = (8, 20)) -> Graph:
+    """
+        Rides take the straight line distance at SPEED (at least a minute), so the heuristics
+        work as on the real data. Trips of a line leave every (LAST - FIRST) / trips, in whole minutes.
+    """
+    rng = random.Random(seed)
+    graph = Graph()
+    coords = []
+    for i in range(stops):
+        name = 'stop %d' % i
+        graph.stop_id(name)
+        coords.append((rng.uniform(*LATITUDE), rng.uniform(*LONGITUDE)))
+        graph.width_height[name] = coords[-1]
+
+    scale = math.cos(math.radians(sum(LATITUDE) / 2))
+    distance = [[
+        6371000 * math.radians(math.hypot(a[0] - b[0], (a[1] - b[1]) * scale)) for b in coords
+    ] for a in coords]
+    nearest = [sorted(range(stops), key=lambda j: distance[i][j])[1:7] for i in range(stops)]
+
+    connections = []
+    served = []
+    headway = max(60, (LAST_DEPARTURE - FIRST_DEPARTURE) // max(trips, 1) // 60 * 60)
+    for line in range(lines):
+        line_id = graph.line_id(str(line + 1))
+
+        # Every line but the first starts at a served stop, so the network is connected
+        route = [rng.choice(served) if served else rng.randrange(stops)]
+        for _ in range(rng.randint(*line_length) - 1):
+            candidates = [stop for stop in nearest[route[-1]] if stop not in route]
+            if not candidates:
+                break
+            route.append(rng.choice(candidates))
+        if len(route) < 2:
+            continue
+        served.extend(stop for stop in route if stop not in served)
+        rides = [max(1, round(distance[a][b] / SPEED / 60)) * 60 for a, b in zip(route, route[1:])]
+
+        offset = rng.randrange(headway // 60) * 60
+        for stops_way, rides_way in ((route, rides), (route[::-1], rides[::-1])):
+            for trip in range(trips):
+                departure = FIRST_DEPARTURE + offset + trip * headway
+                for a, b, ride in zip(stops_way, stops_way[1:], rides_way):
+                    connections.append((a, b, departure, departure + ride, line_id))
+                    departure += ride
+
+    connections.sort()
+    columns = [list(column) for column in zip(*connections)] or [[] for _ in range(5)]
+    graph.set_connections(*columns)
+    return graph
+
+
+def query_set(graph: Graph, queries: int, seed: int = 0) -> list[(str, str, int)]:
+    """
+        Only stops served by some line are asked for.
+    """
+    rng = random.Random(seed)
+    names = [
+        graph.stop_names[stop] for stop in range(len(graph.stop_names))
+        if graph.adj_offsets[stop] < graph.adj_offsets[stop + 1]
+    ]
+    return [
+        (*rng.sample(names, 2), rng.randrange(6 * 60, 20 * 60) * 60)
+        for _ in range(queries)
+    ]
+
+
+def percentiles(values: list[float]) -> dict:
+    values = sorted(values)
+    if not values:
+        return {}
+
+    def rank(p: float) -> float:
+        return values[min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1)]
+
+    return {
+        'p50': rank(50), 'p90': rank(90), 'p99': rank(99),
+        'max': values[-1], 'mean': sum(values) / len(values)
+    }
+
+
+def measure(run, tasks: list) -> dict:
+    """
+        run(task, stats) for every task: latencies and counters in one pass,
+        peak memory in a second one (tracemalloc slows everything down).
+    """
+    latencies = []
+    settled = []
+    total = SearchStats()
+    found = 0
+    for task in tasks:
+        settled_before = total.settled
+        start_time = time.perf_counter()
+        found += bool(run(task, total))
+        latencies.append((time.perf_counter() - start_time) * 1000)
+        settled.append(total.settled - settled_before)
+
+    tracemalloc.start()
+    for task in tasks:
+        run(task, SearchStats())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'runs': len(tasks),
+        'found': found,
+        'latency_ms': percentiles(latencies),
+        'settled': percentiles(settled),
+        'totals': {
+            'searches': total.searches, 'settled': total.settled, 'relaxed': total.relaxed,
+            'pushes': total.pushes, 'pops': total.pops, 'decrease_keys': total.decrease_keys
+        },
+        'peak_memory_bytes': peak
+    }
+
+
+def tabu_tasks(graph: Graph, count: int, goals: int, seed: int = 0) -> list[(str, list[str], int)]:
+    """
+        Goals reachable from start and start reachable back from every goal.
+    """
+    rng = random.Random(seed)
+    tasks = []
+    names = [origin for origin, destination, departure in query_set(graph, count * 10, seed)]
+    for start in names:
+        if len(tasks) == count:
+            break
+        now = rng.randrange(6 * 60, 12 * 60) * 60
+        came_from, cost = one_to_all(graph, start, now)
+        reachable = [stop for stop in cost if stop != start and cost[stop] < 6 * 3600]
+        if len(reachable) < goals:
+            continue
+        chosen = rng.sample(reachable, goals)
+        back = [one_to_all(graph, stop, now + cost[stop])[1] for stop in chosen]
+        if all(start in costs for costs in back):
+            tasks.append((start, chosen, now))
+    return tasks
+
+
+def run_benchmark(args) -> dict:
+    start_time = time.perf_counter()
+    graph = synthetic_graph(args.stops, args.lines, args.trips, args.seed)
+    build_time = time.perf_counter() - start_time
+    queries = query_set(graph, args.queries, args.seed)
+
+    def route_search(search):
+        def run(query, stats):
+            origin, destination, departure = query
+            came_from, cost = search(graph, origin, destination, departure, stats=stats)
+            return destination in came_from
+        return run
+
+    def tabu(task, stats):
+        start, goals, now = task
+        best_route, best_cost, states = tabu_search(
+            graph, start, goals, now, args.tabu_iterations, 3, True,
+            neighbourhood='all', sample_size=20, seed=args.seed, legs=LegCache(stats=stats)
+        )
+        return best_cost < math.inf
+
+    results = {
+        'dijkstra_search': measure(route_search(dijkstra_search), queries),
+        'a_star_time': measure(route_search(a_star_time), queries),
+        'a_star_lines': measure(route_search(a_star_lines), queries)
+    }
+    if args.tabu > 0:
+        results['tabu_search'] = measure(tabu, tabu_tasks(graph, args.tabu, args.tabu_goals, args.seed))
+
+    return {
+        'graph': {
+            'stops': len(graph.stop_names), 'lines': len(graph.lines), 'trips': args.trips,
+            'edges': len(graph.adj_targets), 'connections': len(graph.departures),
+            'seed': args.seed, 'build_s': build_time
+        },
+        'queries': len(queries),
+        'python': sys.version.split()[0],
+        'results': results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the searches on a synthetic timetable.')
+    parser.add_argument('--stops', type=int, default=300, help='stops (default: 300)')
+    parser.add_argument('--lines', type=int, default=40, help='lines, each served both ways (default: 40)')
+    parser.add_argument('--trips', type=int, default=60, help='trips per line and direction a day (default: 60)')
+    parser.add_argument('--queries', type=int, default=200, help='queries per search (default: 200)')
+    parser.add_argument('--tabu', type=int, default=5, help='tabu search runs, 0 to skip (default: 5)')
+    parser.add_argument('--tabu-goals', type=int, default=4, help='stops to visit in a tabu run (default: 4)')
+    parser.add_argument('--tabu-iterations', type=int, default=10, help='tabu search iterations (default: 10)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the timetable and queries (default: 0)')
+    parser.add_argument('-o', '--output', help='JSON output file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    report = json.dumps(run_benchmark(args), indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
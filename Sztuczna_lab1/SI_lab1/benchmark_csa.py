@@ -0,0 +1,31 @@
+import datetime
+import time
+
+from connection_scan import csa_search, connection_scan
+from graph_loader import load_graph
+from structures_functions import dijkstra_search, a_star_time
+
+REPEAT = 20
+
+if __name__ == '__main__':
+    city_map = load_graph()
+
+    start_time = time.time()
+    connection_scan(city_map)
+    end_time = time.time()
+    print('Sorting connections for CSA: ' + str(round(end_time - start_time, 2)) + ' [s]\n')
+
+    values = ('grota-roweckiego', 'pl. grunwaldzki', datetime.time(12, 15, 0))
+
+    """
+        Same query for every function, the average of REPEAT runs
+    """
+    for search in (dijkstra_search, a_star_time, csa_search):
+        start_time = time.time()
+        for _ in range(REPEAT):
+            came_from, cost = search(city_map, values[0], values[1], values[2])
+        end_time = time.time()
+
+        print(search.__name__)
+        print('      Czas przejazdu: ' + str(cost[values[1]] // 60) + ' [min]')
+        print('      Czas działania: ' + str(round((end_time - start_time) / REPEAT * 1000, 2)) + ' [ms]')
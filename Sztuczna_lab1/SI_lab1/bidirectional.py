@@ -0,0 +1,88 @@
+import datetime
+import heapq
+import math
+from typing import Optional, Union
+
+from heuristics import static_graph
+from structures_functions import Graph, Route, SearchStats, best_first_search, search_result, to_seconds
+
+"""
+    Bidirectional search by time:
+        - bidirectional_search  - same query and result as dijkstra_search
+        - bidirectional_route   - same, as a Route
+
+    Arrival at the goal is not known in advance, so the backward search cannot follow real
+    departures. It runs on the static graph (every edge takes its shortest ride), only as far
+    as the forward search asks for it, and gives exact static times to the goal. Waiting only
+    makes a trip longer, so they are consistent lower bounds: the forward search is A* on them
+    (best_first_search) and drops every label that cannot beat the best arrival at the goal found so far.
+"""
+
+
+def static_graph_of(graph: Graph) -> (list[float], list[list[(int, int)]]):
+    """
+        Builds the static graph once per graph and keeps it on the graph.
+    """
+    static = getattr(graph, 'static_graph', None)
+    if static is None:
+        static = graph.static_graph = static_graph(graph)
+    return static
+
+
+class StaticBounds:
+    """
+        Static times to goal, the backward Dijkstra steps on until the stop A* asks for is settled
+        (inf if it cannot reach goal at all).
+    """
+
+    def __init__(self, graph: Graph, goal: int):
+        self.weights, self.reverse = static_graph_of(graph)
+        n = len(graph.stop_names)
+        self.to_goal: list[float] = [math.inf] * n
+        self.settled: list[bool] = [False] * n
+        self.frontier = [(0, goal)]
+        self.to_goal[goal] = 0
+
+    def __getitem__(self, stop: int) -> float:
+        settled, to_goal, frontier = self.settled, self.to_goal, self.frontier
+        while not settled[stop] and frontier:
+            cost, current = heapq.heappop(frontier)
+            if settled[current]:
+                continue
+            settled[current] = True
+            for previous, edge in self.reverse[current]:
+                new_cost = cost + self.weights[edge]
+                if new_cost < to_goal[previous]:
+                    to_goal[previous] = new_cost
+                    heapq.heappush(frontier, (new_cost, previous))
+        return to_goal[stop]
+
+
+def bidirectional_labels(graph: Graph, start_id: int, goal_id: int, now: int,
+                         stats: Optional[SearchStats] = None):
+    """
+        Returns the arrays of best_first_search, the labels on the route to goal are exact.
+        stats - counters of the forward search are added to it
+    """
+    return best_first_search(graph, start_id, now, {goal_id}, StaticBounds(graph, goal_id), stats=stats,
+                             prune_goal=goal_id)
+
+
+def bidirectional_search(graph: Graph, start: str, goal: str, actual_time: Union[datetime.time, int],
+                         stats: Optional[SearchStats] = None):
+    if start not in graph.stop_ids or goal not in graph.stop_ids:
+        return {start: None}, {start: 0}
+    reached, came_from, came_by, cost_so_far = bidirectional_labels(
+        graph, graph.stop_ids[start], graph.stop_ids[goal], to_seconds(actual_time), stats
+    )
+    return search_result(graph, reached, came_from, came_by, cost_so_far)
+
+
+def bidirectional_route(graph: Graph, start: str, goal: str, actual_time: Union[datetime.time, int],
+                        stats: Optional[SearchStats] = None) -> Optional[Route]:
+    if start not in graph.stop_ids or goal not in graph.stop_ids:
+        return None
+    start_id, goal_id = graph.stop_ids[start], graph.stop_ids[goal]
+    now = to_seconds(actual_time)
+    reached, came_from, came_by, cost_so_far = bidirectional_labels(graph, start_id, goal_id, now, stats)
+    return Route.from_predecessors(graph, came_from, came_by, start_id, goal_id, now)
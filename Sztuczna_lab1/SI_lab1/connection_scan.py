@@ -0,0 +1,109 @@
+import datetime
+import math
+from array import array
+from bisect import bisect_left
+from typing import Optional, Union
+
+from structures_functions import Graph, Route, search_result, to_seconds
+
+"""
+    Connection Scan Algorithm (earliest arrival):
+        - ConnectionScan    - every connection of the graph in one array sorted by departure
+        - csa_search        - same query and result as dijkstra_search
+        - csa_route         - same, as a Route
+"""
+
+
+class ConnectionScan:
+    def __init__(self, graph: Graph):
+        from_stops = array('i', [0]) * len(graph.departures)
+        to_stops = array('i', [0]) * len(graph.departures)
+        for stop in range(len(graph.stop_names)):
+            for edge in graph.edges_from(stop):
+                for index in range(graph.edge_offsets[edge], graph.edge_offsets[edge + 1]):
+                    from_stops[index] = stop
+                    to_stops[index] = graph.adj_targets[edge]
+
+        # Ties are broken by arrival, so a connection ending at some second is scanned
+        # before the ones leaving its stop in that second, except for chains of 0 second rides
+        # (scan_connections scans those again)
+        order = sorted(range(len(graph.departures)), key=lambda i: (graph.departures[i], graph.arrivals[i]))
+
+        self.connections = array('i', order)
+        self.departures = array('i', (graph.departures[i] for i in order))
+        self.arrivals = array('i', (graph.arrivals[i] for i in order))
+        self.from_stops = array('i', (from_stops[i] for i in order))
+        self.to_stops = array('i', (to_stops[i] for i in order))
+
+
+def connection_scan(graph: Graph) -> ConnectionScan:
+    """
+        Builds the sorted connection array once per graph and keeps it on the graph.
+    """
+    scan = getattr(graph, 'connection_scan', None)
+    if scan is None:
+        scan = graph.connection_scan = ConnectionScan(graph)
+    return scan
+
+
+def scan_connections(graph: Graph, start_id: int, goal_id: int, now: int):
+    """
+        Earliest arrival from start_id at now, returns the arrays of best_first_search.
+    """
+    scan = connection_scan(graph)
+    departures, arrivals = scan.departures, scan.arrivals
+    from_stops, to_stops = scan.from_stops, scan.to_stops
+
+    n = len(graph.stop_names)
+    came_from: list[int] = [-1] * n
+    came_by: list[int] = [-1] * n
+    earliest: list[float] = [math.inf] * n
+    reached: list[int] = [start_id]
+    earliest[start_id] = now
+
+    i = group = bisect_left(departures, now)  # group - first connection leaving in the same second as i
+    while i < len(departures):
+        departure = departures[i]
+        if departure != departures[group]:
+            group = i
+
+        # Nothing leaving after we are already at the goal can improve it
+        if goal_id != -1 and departure >= earliest[goal_id]:
+            break
+
+        if earliest[from_stops[i]] <= departure:
+            next = to_stops[i]
+            if arrivals[i] < earliest[next]:
+                if earliest[next] == math.inf:
+                    reached.append(next)
+                earliest[next] = arrivals[i]
+                came_from[next] = from_stops[i]
+                came_by[next] = scan.connections[i]
+
+                # A 0 second ride reached next in the same second: rides of this second leaving next
+                # may have been scanned already (only 0 second ones, the rest come after them)
+                if arrivals[i] == departure and i > group:
+                    i = group
+                    continue
+        i += 1
+
+    cost_so_far = [arrival - now for arrival in earliest]
+    return reached, came_from, came_by, cost_so_far
+
+
+def csa_search(graph: Graph, start: str, goal: str, actual_time: Union[datetime.time, int]):
+    if start not in graph.stop_ids:
+        return {start: None}, {start: 0}
+    reached, came_from, came_by, cost_so_far = scan_connections(
+        graph, graph.stop_ids[start], graph.stop_ids.get(goal, -1), to_seconds(actual_time)
+    )
+    return search_result(graph, reached, came_from, came_by, cost_so_far)
+
+
+def csa_route(graph: Graph, start: str, goal: str, actual_time: Union[datetime.time, int]) -> Optional[Route]:
+    if start not in graph.stop_ids or goal not in graph.stop_ids:
+        return None
+    start_id, goal_id = graph.stop_ids[start], graph.stop_ids[goal]
+    now = to_seconds(actual_time)
+    reached, came_from, came_by, cost_so_far = scan_connections(graph, start_id, goal_id, now)
+    return Route.from_predecessors(graph, came_from, came_by, start_id, goal_id, now)
@@ -1,64 +1,16 @@
 import datetime
 import time
 
-import pandas as pd
-
-from structures_functions import Graph, time_diff, dijkstra_search, reconstruct_path
+from graph_loader import load_graph
+from structures_functions import dijkstra_search, reconstruct_path, format_time, SearchStats
 
 if __name__ == '__main__':
-    df = pd.read_csv(
-        'connection_graph.csv',
-        parse_dates=['departure_time', 'arrival_time'],
-        date_parser=lambda x: pd.to_datetime(x, format='%H:%M:%S').time
-    )
-
-    """
-        Reading from file:
-        [0] - Unnamed
-        [1] - ID
-        [2] - Company
-        [3] - Line
-        [4, 5] - time from /to
-        [6, 7] - start / end stop
-        [8, 9] - width / height start stop
-        [10, 11] - width / height end stop 
-    """
-
-    city_map = Graph()
-
-    for row in df.values:
-        stop_from = str(row[6]).lower()
-        stop_to = str(row[7]).lower()
-        if stop_from in city_map.verticles.keys():
-            city_map.verticles[stop_from].append(stop_to)
-        else:
-            city_map.verticles[stop_from] = [stop_to]
-
-        edge = row[4], time_diff(row[5], row[4]), row[3], row[5]
-        if (stop_from, stop_to) in city_map.edges.keys():
-            city_map.edges[(stop_from, stop_to)].append(edge)
-        else:
-            city_map.edges[(stop_from, stop_to)] = [edge]
-
-    """
-    Example data:
-    [('krzyki', 'sowia)] -> [
-        (datetime.time(17, 3), 1, 'A', datetime(17, 4))
-        (datetime.time(17, 18), 1, 'A', dateime(17, 19))
-        (datetime.time(17, 16), 2, 'D', datetime(17, 17)
-        etc.
-    ]
-    """
-
-    """
-        Sorting by time
-    """
-    for r in city_map.edges.values():
-        r.sort(key=lambda x: x[0])
+    city_map = load_graph()
 
     """
         Exercise 1 - Dijkstra algorithm by time
     """
+    stats = SearchStats()
     start_time = time.time()
 
     values = ('grota-roweckiego', 'pl. grunwaldzki', datetime.time(12, 15, 0))
@@ -67,7 +19,8 @@ if __name__ == '__main__':
         city_map,
         values[0],
         values[1],
-        values[2]
+        values[2],
+        stats=stats
     )
     end_time = time.time()
 
@@ -75,11 +28,12 @@ if __name__ == '__main__':
     result = zip(stops, lines)
 
     print("Route")
-    for route_part in result:
-        print('      - ' + str(route_part))
+    for stop, (line, departure, arrival) in result:
+        print('      - ' + stop + ': ' + line + ' ' + format_time(departure) + ' -> ' + format_time(arrival))
 
-    print('Czas przejazdu: ' + str(cost[values[1]]) + ' [min]')
+    print('Czas przejazdu: ' + str(cost[values[1]] // 60) + ' [min]')
     print('Czas działania programu: ' + str(round(end_time - start_time, 2)) + ' [s]')
+    print('Statystyki wyszukiwania: ' + str(stats))
 
 
 
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import pickle
+
+import pandas as pd
+
+from structures_functions import DAY, Graph
+
+"""
+    Loading connection_graph.csv into a Graph:
+        - read_connections   - parses whole columns at once (no per-row date_parser)
+        - build_graph        - interns stops and lines, groups connections by (start_stop, end_stop)
+        - load_graph         - same as above, but the built graph is kept in cache/
+                               and reused until the csv file changes
+"""
+
+CSV_FILE = 'connection_graph.csv'
+CACHE_DIR = 'cache'
+
+# Bump it whenever the layout of Graph changes, old cache files are ignored then
+CACHE_VERSION = 6
+
+# Rides leaving before it run again after midnight, the next day ('00:03:00' -> 24:03)
+NEXT_DAY = 4 * 60 * 60  # [s]
+
+"""
+    Reading from file:
+    [0] - Unnamed
+    [1] - ID
+    [2] - Company
+    [3] - Line
+    [4, 5] - time from /to
+    [6, 7] - start / end stop
+    [8, 9] - width / height start stop
+    [10, 11] - width / height end stop
+"""
+COLUMNS = [
+    'line',
+    'departure_time', 'arrival_time',
+    'start_stop', 'end_stop',
+    'start_stop_lat', 'start_stop_lon',
+    'end_stop_lat', 'end_stop_lon'
+]
+
+
+def read_connections(csv_path: str = CSV_FILE) -> pd.DataFrame:
+    df = pd.read_csv(csv_path, usecols=COLUMNS, dtype={
+        'line': str, 'start_stop': str, 'end_stop': str, 'departure_time': str, 'arrival_time': str
+    })
+
+    df['start_stop'] = df['start_stop'].str.lower()
+    df['end_stop'] = df['end_stop'].str.lower()
+
+    df['departure_time'] = to_seconds(df['departure_time'])
+    df['arrival_time'] = to_seconds(df['arrival_time'])
+
+    # A ride past midnight written as '23:58:00' -> '00:03:00' arrives the next day
+    overnight = df['arrival_time'] < df['departure_time']
+    df.loc[overnight, 'arrival_time'] += DAY
+
+    # The rest of such a trip is written as '00:03:00' -> '00:06:00', the timetable repeats every day,
+    # so early rides are added once more a day later and a late evening query goes on with them
+    next_day = df[df['departure_time'] < NEXT_DAY].copy()
+    next_day['departure_time'] += DAY
+    next_day['arrival_time'] += DAY
+
+    return pd.concat([df, next_day], ignore_index=True)
+
+
+def to_seconds(times: pd.Series) -> pd.Series:
+    """
+        'HH:MM:SS' column to seconds since the start of the service day,
+        hours above 23 (trips past midnight, '25:10:00') are kept as they are.
+    """
+    parts = times.str.split(':', expand=True).astype('int64')
+    return parts[0] * 3600 + parts[1] * 60 + parts[2]
+
+
+def build_graph(df: pd.DataFrame) -> Graph:
+    """
+    Example data (stops and lines are interned to ids, times in seconds since the start of the service day):
+    city_map.stop_names = ['krzyki', 'sowia', ...]
+    city_map.neighbors(0) -> array('i', [1, ...])
+    connections of edge ('krzyki', 'sowia') -> (
+        departures  [61380, 62160, 62280, ...]
+        arrivals    [61440, 62280, 62340, ...]
+        lines       [4, 11, 4, ...]             - ('A', 'D', 'A', ...)
+    )
+    """
+    city_map = Graph()
+
+    stop_codes, stop_names = pd.factorize(pd.concat([df['start_stop'], df['end_stop']], ignore_index=True))
+    city_map.stop_names = list(stop_names)
+    city_map.stop_ids = {stop: i for i, stop in enumerate(city_map.stop_names)}
+
+    line_codes, lines = pd.factorize(df['line'])
+    city_map.lines = list(lines)
+    city_map.line_ids = {line: i for i, line in enumerate(city_map.lines)}
+
+    connections = pd.DataFrame({
+        'from_stop': stop_codes[:len(df)],
+        'to_stop': stop_codes[len(df):],
+        'departure_time': df['departure_time'].to_numpy(),
+        'arrival_time': df['arrival_time'].to_numpy(),
+        'line': line_codes
+    })
+    # Sorting by edge and time, so every edge is a continuous, ordered range for bisect
+    connections.sort_values(
+        ['from_stop', 'to_stop', 'departure_time', 'arrival_time'], kind='stable', ignore_index=True, inplace=True
+    )
+    city_map.set_connections(
+        connections['from_stop'].tolist(), connections['to_stop'].tolist(),
+        connections['departure_time'].tolist(), connections['arrival_time'].tolist(),
+        connections['line'].tolist()
+    )
+
+    # Coordinates of end stops too, some stops are never a start stop
+    stops = pd.DataFrame({
+        'stop': pd.concat([df['start_stop'], df['end_stop']], ignore_index=True),
+        'lat': pd.concat([df['start_stop_lat'], df['end_stop_lat']], ignore_index=True),
+        'lon': pd.concat([df['start_stop_lon'], df['end_stop_lon']], ignore_index=True)
+    }).drop_duplicates('stop')
+    city_map.width_height = dict(zip(stops['stop'], zip(stops['lat'].tolist(), stops['lon'].tolist())))
+    return city_map
+
+
+def cache_path(csv_path: str = CSV_FILE, cache_dir: str = CACHE_DIR) -> str:
+    stat = os.stat(csv_path)
+    key = '%s:%d:%d:%d' % (os.path.abspath(csv_path), stat.st_size, stat.st_mtime_ns, CACHE_VERSION)
+    return os.path.join(cache_dir, 'graph_' + hashlib.sha1(key.encode()).hexdigest() + '.pickle')
+
+
+def load_graph(csv_path: str = CSV_FILE, cache_dir: str = CACHE_DIR, use_cache: bool = True) -> Graph:
+    path = cache_path(csv_path, cache_dir)
+
+    if use_cache and os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, AttributeError, pickle.UnpicklingError):
+            pass  # broken cache file, build it again
+
+    city_map = build_graph(read_connections(csv_path))
+
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(city_map, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    return city_map
@@ -0,0 +1,240 @@
+import heapq
+import math
+import random
+from array import array
+from collections import OrderedDict
+
+"""
+    Heuristics for A* - lower bounds of the time left to the goal, in seconds:
+        - SpeedBound        - straight line distance / fastest speed found in the timetable
+        - Landmarks         - ALT (A*, landmarks, triangle inequality): k landmark stops with the shortest
+                              times from / to every stop on the static graph (every edge takes its shortest ride)
+        - default_heuristic - SpeedBound, or Landmarks where SpeedBound is 0 everywhere
+
+    Every heuristic has bounds(goal) returning a list (or an object indexed like one) by stop id.
+    Waiting only makes a trip longer, so static times are lower bounds of the real ones and
+    d(v, goal) >= max(d(L, goal) - d(L, v), d(v, L) - d(goal, L)) for every landmark L.
+"""
+
+EARTH_RADIUS = 6371000  # [m]
+
+
+class SpeedBound:
+    def __init__(self, graph, max_goals: int = 256):
+        """
+            Stop coordinates are converted to metres once (equirectangular projection around
+            the mean latitude, exact enough within a city). The speed is the highest distance / ride time
+            over all connections. A 0 second ride between stops apart (minute rounded timetables have them)
+            makes it infinite: no bound from the distance holds then, so every bound is 0
+            (default_heuristic takes Landmarks then).
+        """
+        coords = [graph.width_height.get(stop) for stop in graph.stop_names]
+        known = [c for c in coords if c is not None]
+        mean_latitude = math.radians(sum(c[0] for c in known) / len(known)) if known else 0.0
+
+        self.x: list[float] = []
+        self.y: list[float] = []
+        self.known: list[bool] = []
+        for c in coords:
+            self.known.append(c is not None)
+            if c is None:
+                self.x.append(0.0)
+                self.y.append(0.0)
+            else:
+                self.x.append(EARTH_RADIUS * math.radians(c[1]) * math.cos(mean_latitude))
+                self.y.append(EARTH_RADIUS * math.radians(c[0]))
+
+        self.speed = 0.0  # [m/s]
+        for stop in range(len(graph.stop_names)):
+            for edge in graph.edges_from(stop):
+                next = graph.adj_targets[edge]
+                if not (self.known[stop] and self.known[next]):
+                    continue
+                low, high = graph.edge_offsets[edge], graph.edge_offsets[edge + 1]
+                ride = min(graph.arrivals[i] - graph.departures[i] for i in range(low, high))
+                distance = self.distance(stop, next)
+                if ride > 0:
+                    self.speed = max(self.speed, distance / ride)
+                elif distance > 0:
+                    self.speed = math.inf
+
+        self.max_goals = max_goals
+        self.goals: OrderedDict[int, list[float]] = OrderedDict()
+
+    def distance(self, a: int, b: int) -> float:
+        return math.hypot(self.x[a] - self.x[b], self.y[a] - self.y[b])
+
+    def bounds(self, goal: int) -> list[float]:
+        """
+            Seconds needed at least to get from every stop to goal, computed once per goal.
+            Stops without coordinates get 0.
+        """
+        if goal in self.goals:
+            self.goals.move_to_end(goal)
+            return self.goals[goal]
+
+        if goal < 0 or not self.known[goal] or self.speed in (0, math.inf):
+            result = [0.0] * len(self.x)
+        else:
+            result = [
+                self.distance(stop, goal) / self.speed if self.known[stop] else 0.0
+                for stop in range(len(self.x))
+            ]
+
+        self.goals[goal] = result
+        if len(self.goals) > self.max_goals:
+            self.goals.popitem(last=False)
+        return result
+
+
+def speed_bound(graph) -> SpeedBound:
+    """
+        Builds the heuristic once per graph and keeps it on the graph.
+    """
+    heuristic = getattr(graph, 'speed_bound', None)
+    if heuristic is None:
+        heuristic = graph.speed_bound = SpeedBound(graph)
+    return heuristic
+
+
+LANDMARKS = 8
+
+
+def static_graph(graph) -> (list[float], list[list[(int, float)]]):
+    """
+        Shortest ride of every edge and the reversed adjacency (stop -> [(from stop, edge)]).
+    """
+    weights = []
+    reverse = [[] for _ in graph.stop_names]
+    for stop in range(len(graph.stop_names)):
+        for edge in graph.edges_from(stop):
+            low, high = graph.edge_offsets[edge], graph.edge_offsets[edge + 1]
+            weights.append(max(0, min(graph.arrivals[i] - graph.departures[i] for i in range(low, high))))
+            reverse[graph.adj_targets[edge]].append((stop, edge))
+    return weights, reverse
+
+
+def static_distances(graph, weights: list[float], reverse: list[list[(int, int)]], source: int,
+                     backward: bool) -> array:
+    """
+        Plain Dijkstra on the static graph, from source (or to source, if backward).
+    """
+    distance = array('d', [math.inf]) * len(graph.stop_names)
+    distance[source] = 0
+    frontier = [(0, source)]
+    while frontier:
+        cost, current = heapq.heappop(frontier)
+        if cost > distance[current]:
+            continue
+        if backward:
+            edges = reverse[current]
+        else:
+            edges = [(graph.adj_targets[edge], edge) for edge in graph.edges_from(current)]
+        for next, edge in edges:
+            new_cost = cost + weights[edge]
+            if new_cost < distance[next]:
+                distance[next] = new_cost
+                heapq.heappush(frontier, (new_cost, next))
+    return distance
+
+
+class LandmarkBounds:
+    """
+        Bounds towards one goal, computed for a stop the first time A* asks for it.
+    """
+
+    def __init__(self, landmarks: 'Landmarks', goal: int):
+        self.landmarks = landmarks
+        self.goal = goal
+        self.values = array('d', [-1.0]) * len(landmarks.from_landmark[0]) if landmarks.from_landmark else None
+        # Distances of the goal looked up once, landmarks not connected with the goal give no bound
+        self.forward = []
+        self.backward = []
+        if goal >= 0:
+            for from_landmark, to_landmark in zip(landmarks.from_landmark, landmarks.to_landmark):
+                if from_landmark[goal] != math.inf:
+                    self.forward.append((from_landmark, from_landmark[goal]))
+                if to_landmark[goal] != math.inf:
+                    self.backward.append((to_landmark, to_landmark[goal]))
+
+    def __getitem__(self, stop: int) -> float:
+        if self.goal < 0 or self.values is None:
+            return 0.0
+        value = self.values[stop]
+        if value < 0:
+            value = 0.0
+            for from_landmark, to_goal in self.forward:
+                forward = to_goal - from_landmark[stop]
+                if forward > value:
+                    value = forward
+            for to_landmark, from_goal in self.backward:
+                backward = to_landmark[stop] - from_goal
+                if backward > value and backward != math.inf:
+                    value = backward
+            self.values[stop] = value
+        return value
+
+
+class Landmarks:
+    def __init__(self, graph, k: int = LANDMARKS, seed: int = 0, max_goals: int = 256):
+        """
+            Landmarks are picked one by one as the stop farthest from the ones picked so far
+            (farthest reachable stop from a random one for the first).
+        """
+        weights, reverse = static_graph(graph)
+        n = len(graph.stop_names)
+
+        self.landmarks: list[int] = []
+        self.from_landmark: list[array] = []
+        self.to_landmark: list[array] = []
+
+        if n:
+            first = random.Random(seed).randrange(n)
+            closest = static_distances(graph, weights, reverse, first, False)
+            for _ in range(min(k, n)):
+                reachable = [stop for stop in range(n) if closest[stop] != math.inf and stop not in self.landmarks]
+                if not reachable:
+                    break
+                landmark = max(reachable, key=lambda stop: closest[stop])
+
+                self.landmarks.append(landmark)
+                self.from_landmark.append(static_distances(graph, weights, reverse, landmark, False))
+                self.to_landmark.append(static_distances(graph, weights, reverse, landmark, True))
+                if len(self.landmarks) == 1:
+                    closest = self.from_landmark[0]
+                else:
+                    closest = array('d', map(min, closest, self.from_landmark[-1]))
+
+        self.max_goals = max_goals
+        self.goals: OrderedDict[int, LandmarkBounds] = OrderedDict()
+
+    def bounds(self, goal: int) -> LandmarkBounds:
+        if goal in self.goals:
+            self.goals.move_to_end(goal)
+            return self.goals[goal]
+
+        result = self.goals[goal] = LandmarkBounds(self, goal)
+        if len(self.goals) > self.max_goals:
+            self.goals.popitem(last=False)
+        return result
+
+    def __getstate__(self):
+        # Bounds of goals are not worth keeping in the cache file
+        state = self.__dict__.copy()
+        state['goals'] = OrderedDict()
+        return state
+
+
+def default_heuristic(graph):
+    """
+        SpeedBound of the graph, unless its speed is 0 (no coordinates) or infinite (0 second rides between
+        stops apart, minute rounded timetables have them) - every bound would be 0 then and A* a Dijkstra,
+        so Landmarks are used instead. Built once per graph and kept on the graph.
+    """
+    heuristic = getattr(graph, 'default_heuristic', None)
+    if heuristic is None:
+        heuristic = speed_bound(graph)
+        if heuristic.speed in (0, math.inf):
+            heuristic = Landmarks(graph)
+        graph.default_heuristic = heuristic
+    return heuristic
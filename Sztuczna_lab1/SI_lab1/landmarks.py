@@ -0,0 +1,36 @@
+import os
+import pickle
+
+from graph_loader import CSV_FILE, CACHE_DIR, cache_path
+from heuristics import LANDMARKS, Landmarks
+
+"""
+    ALT heuristic (A*, landmarks, triangle inequality) for a_star_time / a_star_lines:
+        - load_landmarks    - heuristics.Landmarks, kept in cache/ next to the graph
+"""
+
+
+def load_landmarks(graph, csv_path: str = CSV_FILE, cache_dir: str = CACHE_DIR, k: int = LANDMARKS,
+                   use_cache: bool = True) -> Landmarks:
+    """
+        Landmarks for the graph loaded from csv_path, kept in cache/ next to the graph itself.
+    """
+    graph_path = cache_path(csv_path, cache_dir)
+    path = os.path.join(cache_dir, os.path.basename(graph_path).replace('graph_', 'landmarks_%d_' % k, 1))
+
+    if use_cache and os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, AttributeError, pickle.UnpicklingError):
+            pass  # broken cache file, compute it again
+
+    landmarks = Landmarks(graph, k)
+
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(landmarks, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    return landmarks
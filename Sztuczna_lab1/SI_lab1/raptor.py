@@ -0,0 +1,232 @@
+import datetime
+import math
+from bisect import bisect_left
+from collections import deque
+from typing import Union
+
+from connection_scan import connection_scan
+from structures_functions import Graph, to_seconds
+
+"""
+    RAPTOR (round-based public transit routing):
+        - RaptorTimetable   - trips rebuilt from the connections and grouped into routes
+        - raptor_search     - Pareto set of (arrival, transfers) for one query, exact
+                              version of what a_star_lines approximates with the LINE_CHANGE penalty
+"""
+
+MAX_TRANSFERS = 5
+
+
+class RaptorTimetable:
+    def __init__(self, graph: Graph):
+        """
+            connection_graph.csv has no trip ids, so trips are rebuilt by chaining connections
+            of the same line: one arriving at a stop continues with one leaving it at the same time.
+        """
+        scan = connection_scan(graph)
+
+        trip_connections: list[list[int]] = []
+        trip_stops: list[list[int]] = []
+        waiting: dict[(int, int, int), list[int]] = {}  # (line, stop, time) -> trips standing there
+
+        for i in trip_order(graph, scan):
+            connection = scan.connections[i]
+            line = graph.connection_lines[connection]
+            to_stop = scan.to_stops[i]
+
+            trips = waiting.get((line, scan.from_stops[i], scan.departures[i]))
+            trip = -1
+            if trips:
+                # Prefer a trip that does not just turn back where it came from
+                trip = trips[-1]
+                for candidate in trips:
+                    if len(trip_stops[candidate]) < 2 or trip_stops[candidate][-2] != to_stop:
+                        trip = candidate
+                        break
+                trips.remove(trip)
+
+            if trip == -1:
+                trip = len(trip_connections)
+                trip_connections.append([])
+                trip_stops.append([scan.from_stops[i]])
+            trip_connections[trip].append(connection)
+            trip_stops[trip].append(to_stop)
+            waiting.setdefault((line, to_stop, scan.arrivals[i]), []).append(trip)
+
+        self.trip_connections = trip_connections
+
+        # Trips with the same line and stop sequence make a route, as long as they never overtake each other
+        self.route_stops: list[list[int]] = []
+        self.route_trips: list[list[int]] = []
+        self.route_departures: list[list[list[int]]] = []  # [route][position][trip in route]
+        patterns: dict[(int, tuple), list[int]] = {}
+
+        for trip in sorted(range(len(trip_connections)), key=lambda t: graph.departures[trip_connections[t][0]]):
+            key = graph.connection_lines[trip_connections[trip][0]], tuple(trip_stops[trip])
+            departures = [graph.departures[c] for c in trip_connections[trip]]
+
+            for route in patterns.setdefault(key, []):
+                if all(d >= last[-1] for d, last in zip(departures, self.route_departures[route])):
+                    break
+            else:
+                route = len(self.route_stops)
+                patterns[key].append(route)
+                self.route_stops.append(trip_stops[trip])
+                self.route_trips.append([])
+                self.route_departures.append([[] for _ in departures])
+
+            self.route_trips[route].append(trip)
+            for position, departure in enumerate(departures):
+                self.route_departures[route][position].append(departure)
+
+        self.stop_routes: list[list[(int, int)]] = [[] for _ in graph.stop_names]
+        for route, stops in enumerate(self.route_stops):
+            for position, stop in enumerate(stops[:-1]):
+                self.stop_routes[stop].append((route, position))
+
+    def arrival(self, graph: Graph, route: int, trip: int, position: int) -> int:
+        return graph.arrivals[self.trip_connections[self.route_trips[route][trip]][position - 1]]
+
+
+def trip_order(graph: Graph, scan) -> list[int]:
+    """
+        Indexes into the ConnectionScan arrays in scan order, except that in every second
+        a 0 second ride of a line comes before the rides of the line leaving its stop in that second
+        (minute rounded timetables chain them), so they are joined into one trip.
+    """
+    lines = [graph.connection_lines[connection] for connection in scan.connections]
+    order = []
+    start = 0
+    while start < len(lines):
+        end = start
+        while end < len(lines) and scan.departures[end] == scan.departures[start]:
+            end += 1
+
+        # (line, stop) -> 0 second rides of the second not ordered yet, arriving there
+        incoming: dict[(int, int), int] = {}
+        for i in range(start, end):
+            if scan.arrivals[i] == scan.departures[i]:
+                key = lines[i], scan.to_stops[i]
+                incoming[key] = incoming.get(key, 0) + 1
+
+        ready = deque()
+        blocked: dict[(int, int), list[int]] = {}
+        for i in range(start, end):
+            key = lines[i], scan.from_stops[i]
+            if incoming.get(key):
+                blocked.setdefault(key, []).append(i)
+            else:
+                ready.append(i)
+
+        while ready or blocked:
+            if not ready:
+                # A cycle of 0 second rides, the ride first in scan order goes first
+                key = min(blocked, key=lambda k: blocked[k][0])
+                ready.extend(blocked.pop(key))
+            i = ready.popleft()
+            order.append(i)
+            if scan.arrivals[i] == scan.departures[i]:
+                key = lines[i], scan.to_stops[i]
+                incoming[key] -= 1
+                if not incoming[key] and key in blocked:
+                    ready.extend(blocked.pop(key))
+        start = end
+    return order
+
+
+def raptor_timetable(graph: Graph) -> RaptorTimetable:
+    """
+        Builds the routes once per graph and keeps them on the graph.
+    """
+    timetable = getattr(graph, 'raptor_timetable', None)
+    if timetable is None:
+        timetable = graph.raptor_timetable = RaptorTimetable(graph)
+    return timetable
+
+
+def raptor_search(
+        graph: Graph, start: str, goal: str, actual_time: Union[datetime.time, int],
+        max_transfers: int = MAX_TRANSFERS
+) -> list[(int, int, dict)]:
+    """
+        Returns every Pareto optimal journey as (travel time, transfers, came_from),
+        sorted by transfers; came_from has the shape used by reconstruct_path.
+    """
+    if start not in graph.stop_ids or goal not in graph.stop_ids:
+        return []
+    start_id = graph.stop_ids[start]
+    goal_id = graph.stop_ids[goal]
+
+    timetable = raptor_timetable(graph)
+    route_stops, route_departures = timetable.route_stops, timetable.route_departures
+
+    now = to_seconds(actual_time)
+    n = len(graph.stop_names)
+    best: list[float] = [math.inf] * n
+    best[start_id] = now
+
+    # arrivals[k][stop] - earliest arrival using at most k trips, parents[k][stop] - (route, trip, board, alight)
+    arrivals: list[list[float]] = [best[:]]
+    parents: list[list] = [[None] * n]
+    marked = {start_id}
+
+    for k in range(1, max_transfers + 2):
+        previous = arrivals[k - 1]
+        arrival = previous[:]
+        parent = parents[k - 1][:]
+        arrivals.append(arrival)
+        parents.append(parent)
+
+        queue: dict[int, int] = {}
+        for stop in marked:
+            for route, position in timetable.stop_routes[stop]:
+                if position < queue.get(route, math.inf):
+                    queue[route] = position
+        marked = set()
+
+        for route, first in queue.items():
+            stops = route_stops[route]
+            trip = -1
+            board = -1
+            for position in range(first, len(stops)):
+                stop = stops[position]
+
+                if trip != -1:
+                    time = timetable.arrival(graph, route, trip, position)
+                    if time < best[stop] and time < best[goal_id]:
+                        arrival[stop] = best[stop] = time
+                        parent[stop] = route, trip, board, position
+                        marked.add(stop)
+
+                if position < len(stops) - 1 and previous[stop] < math.inf:
+                    departures = route_departures[route][position]
+                    if trip == -1 or previous[stop] <= departures[trip]:
+                        earlier = bisect_left(departures, previous[stop], 0, len(departures) if trip == -1 else trip)
+                        if earlier < len(departures) and (trip == -1 or earlier < trip):
+                            trip = earlier
+                            board = position
+
+        if not marked:
+            break
+
+    journeys = []
+    for k in range(1, len(arrivals)):
+        if arrivals[k][goal_id] < arrivals[k - 1][goal_id]:
+            journeys.append((arrivals[k][goal_id] - now, k - 1, journey(graph, timetable, parents, k, goal_id)))
+    return journeys
+
+
+def journey(graph: Graph, timetable: RaptorTimetable, parents: list[list], k: int, goal: int) -> dict:
+    came_from = {}
+    stop = goal
+    while k > 0 and parents[k][stop] is not None:
+        route, trip, board, alight = parents[k][stop]
+        stops = timetable.route_stops[route]
+        connections = timetable.trip_connections[timetable.route_trips[route][trip]]
+        for position in range(board, alight):
+            came_from[graph.stop_names[stops[position + 1]]] = \
+                graph.stop_names[stops[position]], graph.connection(connections[position])
+        stop = stops[board]
+        k -= 1
+    came_from[graph.stop_names[stop]] = None
+    return came_from
@@ -1,137 +1,457 @@
-import heapq
+import datetime
 import itertools
+import json
 import math
-from datetime import datetime
+import os
+import random
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from re import T
-from typing import Optional
+from typing import Optional, Union
+
+from heuristics import default_heuristic
+
+DAY = 24 * 60 * 60  # [s]
+LINE_CHANGE = 600 * 60  # [s], a_star_lines penalty for changing the line
 
 """
     Structures:
-        - Graph
-        - Priority Queue
+        - Graph                     - with next departures of an edge
+        - Indexed Priority Queue    - heap with decrease-key, used by the searches
+        - Search Stats              - counters of the searches
+        - Line Table                - connections of every edge split by line
+        - Route / Leg               - result of a search, legs grouped by line
 """
 
 
+def departures_after(departures: array, low: int, end: int, actual_time: int, k: Optional[int] = 1,
+                     wrap: bool = False) -> list[(int, int)]:
+    """
+        Up to k (every one if None) departures at or after actual_time from departures[low:end]
+        (sorted), as (index, departure); one bisect, then a walk over the next ones.
+        With wrap, the timetable repeats every DAY (departures in the range may not span more than
+        a day): after the last departure come the first ones of the next day, shifted by DAY.
+    """
+    shift = 0
+    if wrap and low < end and actual_time > departures[end - 1]:
+        shift = ((actual_time - departures[end - 1] - 1) // DAY + 1) * DAY
+    first = index = bisect_left(departures, actual_time - shift, low, end)
+
+    result = []
+    wrapped = False
+    while k is None or len(result) < k:
+        if index == end:
+            if not wrap or wrapped or low == end:
+                break
+            index, shift, wrapped = low, shift + DAY, True
+        if wrapped and index == first:
+            break
+        result.append((index, departures[index] + shift))
+        index += 1
+    return result
+
+
 class Graph:
     def __init__(self):
-        self.edges: dict[(str, str), (datetime.time, int, str, datetime.time)] = {}
-        self.verticles: dict[str, list[str]] = {}
+        self.stop_names: list[str] = []
+        self.stop_ids: dict[str, int] = {}
+        self.lines: list[str] = []
+        self.line_ids: dict[str, int] = {}
         self.width_height: dict[str, (float, float)] = {}
 
-    def neighbors(self, id: str) -> list[str]:
-        return self.verticles[id]
+        # Compressed sparse row adjacency, every (from, to) pair is stored once:
+        # edges of stop v are slots adj_offsets[v] .. adj_offsets[v + 1] - 1, slot e goes to adj_targets[e]
+        # and its connections are edge_offsets[e] .. edge_offsets[e + 1] - 1 in the arrays below
+        # (sorted by departure, times in seconds since the start of the service day - past midnight
+        # they go on above DAY, lines as indexes into self.lines)
+        self.adj_offsets = array('i', [0])
+        self.adj_targets = array('i')
+        self.edge_offsets = array('i', [0])
+        self.departures = array('i')
+        self.arrivals = array('i')
+        self.connection_lines = array('i')
+
+    def stop_id(self, stop: str) -> int:
+        if stop not in self.stop_ids:
+            self.stop_ids[stop] = len(self.stop_names)
+            self.stop_names.append(stop)
+        return self.stop_ids[stop]
+
+    def line_id(self, line: str) -> int:
+        if line not in self.line_ids:
+            self.line_ids[line] = len(self.lines)
+            self.lines.append(line)
+        return self.line_ids[line]
+
+    def set_connections(
+            self,
+            from_stops: list[int], to_stops: list[int],
+            departures: list[int], arrivals: list[int], lines: list[int]
+    ):
+        """
+            Builds the adjacency from connections sorted by (from_stop, to_stop, departure).
+            Stops and lines have to be interned before (stop_id, line_id).
+        """
+        adj_offsets = [0] * (len(self.stop_names) + 1)
+        adj_targets = []
+        edge_offsets = []
+
+        previous = None
+        for i, edge in enumerate(zip(from_stops, to_stops)):
+            if edge != previous:
+                adj_offsets[edge[0] + 1] += 1
+                adj_targets.append(edge[1])
+                edge_offsets.append(i)
+                previous = edge
+        edge_offsets.append(len(departures))
+
+        for stop in range(len(self.stop_names)):
+            adj_offsets[stop + 1] += adj_offsets[stop]
+
+        self.adj_offsets = array('i', adj_offsets)
+        self.adj_targets = array('i', adj_targets)
+        self.edge_offsets = array('i', edge_offsets)
+        self.departures = array('i', departures)
+        self.arrivals = array('i', arrivals)
+        self.connection_lines = array('i', lines)
+
+    def neighbors(self, id: int) -> array:
+        return self.adj_targets[self.adj_offsets[id]:self.adj_offsets[id + 1]]
+
+    def edges_from(self, id: int) -> range:
+        return range(self.adj_offsets[id], self.adj_offsets[id + 1])
+
+    def connection(self, index: int) -> (str, int, int):
+        return self.lines[self.connection_lines[index]], self.departures[index], self.arrivals[index]
+
+    def next_departures(self, edge: int, actual_time: int, k: Optional[int] = 1, wrap: bool = False) -> \
+            list[(int, int)]:
+        """
+            Up to k connections of the edge leaving at or after actual_time, as (connection index, departure),
+            see departures_after.
+        """
+        return departures_after(self.departures, self.edge_offsets[edge], self.edge_offsets[edge + 1],
+                                actual_time, k, wrap)
+
+    def next_departure(self, edge: int, actual_time: int, wrap: bool = False) -> Optional[tuple[int, int]]:
+        end = self.edge_offsets[edge + 1]
+        index = bisect_left(self.departures, actual_time, self.edge_offsets[edge], end)
+        if index < end:
+            return index, self.departures[index]
+        result = self.next_departures(edge, actual_time, 1, True) if wrap else None
+        return result[0] if result else None
 
     """
-        Time cost in minutes
+        Time cost in seconds
         Fast version, exercise 1D
         Time improvment for searching in B
         for loop        = 0,67 [s]
         binary search   = 0,24 [s]
+        bisect on int arrays instead of (datetime.time, ...) tuples
     """
 
-    def cost_time(self, from_stop: str, to_stop: str, actual_time: datetime.time) -> \
-            (int, (str, datetime.time, datetime.time)):
-        all_edges = self.edges[from_stop, to_stop]
-        index = binary_search(all_edges, 0, len(all_edges) - 1, actual_time)
-        if index != -1:
-            e = all_edges[index]
-            return e[1] - time_diff(actual_time, e[0]), (e[2], e[0], e[3])
+    def cost_time(self, edge: int, actual_time: int) -> (int, int):
+        end = self.edge_offsets[edge + 1]
+        index = bisect_left(self.departures, actual_time, self.edge_offsets[edge], end)
+        if index < end:
+            return self.arrivals[index] - actual_time, index
         else:
             return None
 
-        # -------------- Old slow version ---------------------------
-        # for e in self.edges[(from_stop, to_stop)]:
-        #     if e[0] >= actual_time:
-        #         return e[1] - time_diff(actual_time, e[0]), (e[2], e[0], e[3])
-        # return None
 
+class IndexedPriorityQueue:
     """
-        Time cost in lines
-        Fast version, exercise 1D
-
-        Time improvement for searching in C
-        for loop        = 0,51 [s]
-        binary search   = 0,14 [s]
+        Binary heap with the position of every item, so put lowers the priority of an item
+        already in the queue instead of pushing it again (decrease-key).
+        Items that left the queue are settled; putting one again reopens it.
     """
 
-    def cost_lines(self, from_stop: str, to_stop: str, actual_time: datetime.time, line: str) -> \
-            (int, (str, datetime.time, datetime.time)):
-        all_edges = self.edges[from_stop, to_stop]
-        index = binary_search(all_edges, 0, len(all_edges) - 1, actual_time)
-        if index != -1:
-            e = all_edges[index]
-            if e[2] == line:
-                return e[1] - time_diff(actual_time, e[0]), (e[2], e[0], e[3])
-            else:
-                return e[1] - time_diff(actual_time, e[0]) + 600, (e[2], e[0], e[3])
-        else:
-            return None
-
-        # -------------- Old slow version ---------------------------
-        # for e in self.edges[(from_stop, to_stop)]:
-        #     if e[0] >= actual_time:
-        #         if e[2] == line:
-        #             return e[1] - time_diff(actual_time, e[0]), (e[2], e[0], e[3])
-        #         else:
-        #             return e[1] - time_diff(actual_time, e[0]) + 600, (e[2], e[0], e[3])
-        # return None
-
-
-class PriorityQueue:
     def __init__(self):
         self.elements: list[tuple[float, T]] = []
+        self.position: dict[T, int] = {}
+        self.settled: set[T] = set()
+        self.pushes = 0
+        self.pops = 0
+        self.decrease_keys = 0
+        self.reopened = 0
 
     def empty(self) -> bool:
         return not self.elements
 
     def put(self, item: T, priority: float):
-        heapq.heappush(self.elements, (priority, item))
+        index = self.position.get(item)
+        if index is None:
+            if item in self.settled:
+                self.settled.discard(item)
+                self.reopened += 1
+            self.pushes += 1
+            self.elements.append((priority, item))
+            self.sift_up(len(self.elements) - 1)
+        elif priority < self.elements[index][0]:
+            self.decrease_keys += 1
+            self.elements[index] = (priority, item)
+            self.sift_up(index)
 
     def get(self) -> T:
-        return heapq.heappop(self.elements)[1]
+        self.pops += 1
+        elements = self.elements
+        item = elements[0][1]
+        last = elements.pop()
+        del self.position[item]
+        if elements:
+            elements[0] = last
+            self.sift_down(0)
+        self.settled.add(item)
+        return item
+
+    def sift_up(self, index: int):
+        elements, position = self.elements, self.position
+        element = elements[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if element < elements[parent]:
+                elements[index] = elements[parent]
+                position[elements[index][1]] = index
+                index = parent
+            else:
+                break
+        elements[index] = element
+        position[element[1]] = index
+
+    def sift_down(self, index: int):
+        elements, position = self.elements, self.position
+        size = len(elements)
+        element = elements[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and elements[child + 1] < elements[child]:
+                child += 1
+            if elements[child] < element:
+                elements[index] = elements[child]
+                position[elements[index][1]] = index
+                index = child
+            else:
+                break
+        elements[index] = element
+        position[element[1]] = index
 
+    def __str__(self):
+        return 'pushes: %d, pops: %d, decrease-key: %d, reopened: %d' % (
+            self.pushes, self.pops, self.decrease_keys, self.reopened
+        )
 
-"""
-    Helper functions:
-        - binary_search
-        - heuristic (for A*)
-        - reconstruct_path
-        - time_diff
-"""
 
+class SearchStats:
+    """
+        Counters of best_first_search. Passing the same object to many searches sums them up.
+    """
 
-def binary_search(arr, low, high, x):
-    if high >= low:
-        mid = (high + low) // 2
-        if arr[mid][0] == x:
-            return mid
-        elif arr[mid][0] > x:
-            return binary_search(arr, low, mid - 1, x)
-        else:
-            return binary_search(arr, mid + 1, high, x)
-    else:
-        if low >= len(arr):
-            return -1
-        if arr[low][0] > x:
-            return low
-        else:
-            return -1
+    def __init__(self):
+        self.searches = 0
+        self.settled = 0
+        self.relaxed = 0
+        self.pushes = 0
+        self.pops = 0
+        self.decrease_keys = 0
+        self.time = 0.0  # [s]
+
+    def add(self, frontier: IndexedPriorityQueue, settled: int, relaxed: int, seconds: float):
+        self.searches += 1
+        self.settled += settled
+        self.relaxed += relaxed
+        self.pushes += frontier.pushes
+        self.pops += frontier.pops
+        self.decrease_keys += frontier.decrease_keys
+        self.time += seconds
+
+    def __str__(self):
+        return 'searches: %d, settled: %d, relaxed: %d, pushes: %d, pops: %d, decrease-key: %d, time: %.4f [s]' % (
+            self.searches, self.settled, self.relaxed, self.pushes, self.pops, self.decrease_keys, self.time
+        )
 
 
-def heurisitc(graph, current, next):
-    try:
-        return \
-                abs(graph.width_height[current][0] - graph.width_height[next][0]) + \
-                abs(graph.width_height[current][1] - graph.width_height[next][1])
-    except KeyError:
-        return 0.0
+class LineTable:
+    def __init__(self, graph: Graph):
+        """
+            Connections of every edge split by line, for searches over (stop, line) states:
+            segments of edge e are edge_segments[e] .. edge_segments[e + 1] - 1, segment s is
+            line segment_lines[s] and its connections are segment_offsets[s] .. segment_offsets[s + 1] - 1
+            in connections (indexes into the graph arrays) and departures, sorted by departure.
+        """
+        edge_segments = [0]
+        segment_lines = []
+        segment_offsets = [0]
+        connections = []
+        for edge in range(len(graph.adj_targets)):
+            low, high = graph.edge_offsets[edge], graph.edge_offsets[edge + 1]
+            previous = -1
+            for index in sorted(range(low, high), key=lambda i: (graph.connection_lines[i], graph.departures[i])):
+                line = graph.connection_lines[index]
+                if line != previous:
+                    if previous != -1:
+                        segment_offsets.append(len(connections))
+                    segment_lines.append(line)
+                    previous = line
+                connections.append(index)
+            if previous != -1:
+                segment_offsets.append(len(connections))
+            edge_segments.append(len(segment_lines))
+
+        self.edge_segments = array('i', edge_segments)
+        self.segment_lines = array('i', segment_lines)
+        self.segment_offsets = array('i', segment_offsets)
+        self.connections = array('i', connections)
+        self.departures = array('i', (graph.departures[i] for i in connections))
+
+    def next_departures(self, segment: int, actual_time: int, k: Optional[int] = 1, wrap: bool = False) -> \
+            list[(int, int)]:
+        """
+            Up to k connections of the segment (one line of an edge) leaving at or after actual_time,
+            as (connection index into the graph arrays, departure), see departures_after.
+        """
+        found = departures_after(self.departures, self.segment_offsets[segment], self.segment_offsets[segment + 1],
+                                 actual_time, k, wrap)
+        return [(self.connections[index], departure) for index, departure in found]
+
+    def next_departure(self, segment: int, actual_time: int, wrap: bool = False) -> Optional[tuple[int, int]]:
+        end = self.segment_offsets[segment + 1]
+        index = bisect_left(self.departures, actual_time, self.segment_offsets[segment], end)
+        if index < end:
+            return self.connections[index], self.departures[index]
+        result = self.next_departures(segment, actual_time, 1, True) if wrap else None
+        return result[0] if result else None
+
+
+def line_table(graph: Graph) -> LineTable:
+    """
+        Builds the table once per graph and keeps it on the graph.
+    """
+    table = getattr(graph, 'line_table', None)
+    if table is None:
+        table = graph.line_table = LineTable(graph)
+    return table
+
+
+class Leg:
+    """
+        Part of a route ridden on one line: board at from_stop, alight at to_stop after rides connections.
+    """
+    __slots__ = ('line', 'from_stop', 'to_stop', 'departure', 'arrival', 'rides')
+
+    def __init__(self, line: str, from_stop: str, to_stop: str, departure: int, arrival: int, rides: int):
+        self.line = line
+        self.from_stop = from_stop
+        self.to_stop = to_stop
+        self.departure = departure
+        self.arrival = arrival
+        self.rides = rides
+
+    def to_dict(self) -> dict:
+        return {
+            'line': self.line, 'from': self.from_stop, 'to': self.to_stop,
+            'departure': format_time(self.departure), 'arrival': format_time(self.arrival), 'rides': self.rides
+        }
+
+
+class Route:
+    """
+        Route found by a search, kept as ids: stops[0] is the start, stops[i + 1] is reached
+        by connection connections[i]. Legs are built while iterating over the route.
+    """
+    __slots__ = ('graph', 'stops', 'connections', 'departure_time')
+
+    def __init__(self, graph: Graph, stops: array, connections: array, departure_time: int):
+        self.graph = graph
+        self.stops = stops
+        self.connections = connections
+        self.departure_time = departure_time
+
+    @classmethod
+    def from_predecessors(cls, graph: Graph, came_from: list[int], came_by: list[int], start: int, goal: int,
+                          departure_time: int) -> Optional['Route']:
+        """
+            Route to goal from the arrays of a search (-1 - no predecessor), None if goal was not reached.
+        """
+        if goal < 0 or (goal != start and came_from[goal] == -1):
+            return None
+        stops = array('i')
+        connections = array('i')
+        stop = goal
+        while stop != start:
+            stops.append(stop)
+            connections.append(came_by[stop])
+            stop = came_from[stop]
+        stops.append(start)
+        stops.reverse()
+        connections.reverse()
+        return cls(graph, stops, connections, departure_time)
+
+    @property
+    def arrival(self) -> int:
+        return self.graph.arrivals[self.connections[-1]] if self.connections else self.departure_time
+
+    @property
+    def travel_time(self) -> int:
+        return self.arrival - self.departure_time
+
+    @property
+    def transfers(self) -> int:
+        return max(0, sum(1 for _ in self.legs()) - 1)
+
+    def __len__(self):
+        return len(self.connections)
+
+    def __iter__(self):
+        return self.legs()
+
+    def legs(self):
+        """
+            A leg ends where the line changes or where the next ride does not leave
+            at the arrival of the previous one (a later vehicle of the same line).
+        """
+        graph, stops, connections = self.graph, self.stops, self.connections
+        first = 0
+        for i in range(1, len(connections) + 1):
+            line = graph.connection_lines[connections[first]]
+            if i == len(connections) or graph.connection_lines[connections[i]] != line or \
+                    graph.arrivals[connections[i - 1]] != graph.departures[connections[i]]:
+                yield Leg(
+                    graph.lines[line], graph.stop_names[stops[first]], graph.stop_names[stops[i]],
+                    graph.departures[connections[first]], graph.arrivals[connections[i - 1]], i - first
+                )
+                first = i
+
+    def to_dict(self) -> dict:
+        legs = [leg.to_dict() for leg in self.legs()]
+        return {
+            'departure_time': format_time(self.departure_time),
+            'arrival_time': format_time(self.arrival),
+            'travel_time': self.travel_time,
+            'transfers': max(0, len(legs) - 1),
+            'legs': legs
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+
+"""
+    Helper functions:
+        - reconstruct_path
+        - to_seconds / parse_time / format_time
+"""
 
 
 def reconstruct_path(came_from: dict[str, str], start: str, goal: str) -> \
-        (list[str], list[(str, datetime.time, datetime.time)]):
+        (list[str], list[(str, int, int)]):
     current: str = goal
     path: list[str] = []
-    lines: list[(str, datetime.time, datetime.time)] = []
+    lines: list[(str, int, int)] = []
     if goal not in came_from:  # no path was found
         return []
 
@@ -148,8 +468,36 @@ def reconstruct_path(came_from: dict[str, str], start: str, goal: str) -> \
     return path, lines
 
 
-def time_diff(to_time, from_time):
-    return (to_time.hour * 60 + to_time.minute) - (from_time.hour * 60 + from_time.minute)
+def to_seconds(actual_time: Union[datetime.time, int]) -> int:
+    """
+        Seconds since the start of the service day, ints are taken as they are.
+    """
+    if isinstance(actual_time, int):
+        return actual_time
+    return actual_time.hour * 3600 + actual_time.minute * 60 + actual_time.second
+
+
+def parse_time(text: str) -> int:
+    """
+        'HH:MM' or 'HH:MM:SS' to seconds, hours past midnight may go on above 23 ('25:10').
+    """
+    parts = text.split(':')
+    if len(parts) not in (2, 3):
+        raise ValueError('Bad time: ' + text)
+    seconds = int(parts[0]) * 3600 + int(parts[1]) * 60
+    if len(parts) == 3:
+        seconds += int(parts[2])
+    return seconds
+
+
+def format_time(seconds: int) -> str:
+    """
+        'HH:MM', or 'HH:MM:SS' if there are seconds; hours above 23 are kept ('25:10').
+    """
+    minutes, second = divmod(seconds, 60)
+    if second:
+        return '%02d:%02d:%02d' % (*divmod(minutes, 60), second)
+    return '%02d:%02d' % divmod(minutes, 60)
 
 
 """
@@ -161,190 +509,489 @@ def time_diff(to_time, from_time):
 """
 
 
-def dijkstra_search(graph: Graph, start: str, goal: str, actual_time: datetime.time):
-    frontier = PriorityQueue()
-    frontier.put(start, 0)
+def search_result(graph: Graph, reached: list[int], came_from: list[int], came_by: list[int],
+                  cost_so_far: list[float]):
+    """
+        Translates search state kept by stop id back to dicts keyed by stop names
+        (the shape expected by reconstruct_path).
+    """
+    names = graph.stop_names
+    came_from_names: dict[str, (Optional[str], (str, int, int))] = {}
+    cost_so_far_names: dict[str, float] = {}
+    for stop in reached:
+        if came_from[stop] == -1:
+            came_from_names[names[stop]] = None
+        else:
+            came_from_names[names[stop]] = names[came_from[stop]], graph.connection(came_by[stop])
+        cost_so_far_names[names[stop]] = cost_so_far[stop]
+    return came_from_names, cost_so_far_names
 
-    came_from: dict[str, (Optional[str], (str, datetime.time))] = {}
-    cost_so_far: dict[str, float] = {}
-    time_so_far: dict[str, datetime.time] = {}
 
-    came_from[start] = None
-    cost_so_far[start] = 0
-    time_so_far[start] = actual_time
+def best_first_search(graph: Graph, start_id: int, now: int,
+                      goals: Optional[set[int]] = None, bounds=None, arrival_bound: Optional[list[float]] = None,
+                      stats: Optional[SearchStats] = None, prune_goal: Optional[int] = None):
+    """
+        The search by travel time (cost_time) behind dijkstra_search, a_star_time, profile_search
+        and bidirectional_search:
+            goals           - stops once every stop from goals is settled (never, if None)
+            bounds          - A* lower bounds indexed by stop (see heuristics.py), Dijkstra if None
+            arrival_bound   - labels arriving at or after arrival_bound[stop] are dropped
+            stats           - counters are added to it
+            prune_goal      - labels whose cost + bound cannot beat the best cost of prune_goal so far
+                              are dropped (an infinite bound - prune_goal unreachable - drops them always)
+    """
+    started = time.perf_counter()
+    n = len(graph.stop_names)
+    came_from: list[int] = [-1] * n
+    came_by: list[int] = [-1] * n
+    cost_so_far: list[float] = [math.inf] * n
+    time_so_far: list[int] = [0] * n
+    reached: list[int] = [start_id]
+    left = set(goals) if goals is not None else None
+    settled = relaxed = 0
+
+    frontier = IndexedPriorityQueue()
+    frontier.put(start_id, 0)
+    cost_so_far[start_id] = 0
+    time_so_far[start_id] = now
 
     while not frontier.empty():
-        current: str = frontier.get()
-
-        if current == goal:
-            break
+        current: int = frontier.get()
+        settled += 1
 
-        try:
-            graph.neighbors(current)
-        except KeyError:
-            continue
+        if left is not None:
+            left.discard(current)
+            if not left:
+                break
 
-        for next in graph.neighbors(current):
-            cost_with_route = graph.cost_time(current, next, time_so_far[current])
+        for edge in graph.edges_from(current):
+            relaxed += 1
+            cost_with_route = graph.cost_time(edge, time_so_far[current])
             if cost_with_route is None:
                 continue
+            next = graph.adj_targets[edge]
             new_cost = cost_so_far[current] + cost_with_route[0]
 
-            if next not in cost_so_far or new_cost < cost_so_far[next]:
+            if new_cost < cost_so_far[next]:
+                arrival = graph.arrivals[cost_with_route[1]]
+                if arrival_bound is not None and arrival >= arrival_bound[next]:
+                    continue
+                priority = new_cost if bounds is None else new_cost + bounds[next]
+                if prune_goal is not None and priority >= cost_so_far[prune_goal]:
+                    continue
+                if cost_so_far[next] == math.inf:
+                    reached.append(next)
                 cost_so_far[next] = new_cost
-                priority = new_cost
                 frontier.put(next, priority)
-                came_from[next] = current, cost_with_route[1]
-                time_so_far[next] = cost_with_route[1][2]
+                came_from[next] = current
+                came_by[next] = cost_with_route[1]
+                time_so_far[next] = arrival
 
-    return came_from, cost_so_far
+    if stats is not None:
+        stats.add(frontier, settled, relaxed, time.perf_counter() - started)
+    return reached, came_from, came_by, cost_so_far
 
 
-def a_star_time(graph: Graph, start: str, goal: str, actual_time: datetime.time):
-    frontier = PriorityQueue()
-    frontier.put(start, 0)
+def route_search(graph: Graph, start: str, goal: str, actual_time: Union[datetime.time, int], heuristic=None,
+                 stats: Optional[SearchStats] = None):
+    if start not in graph.stop_ids:
+        return {start: None}, {start: 0}
+    goal_id = graph.stop_ids.get(goal, -1)
+    bounds = heuristic.bounds(goal_id) if heuristic is not None else None
 
-    came_from: dict[str, (Optional[str], (str, datetime.time))] = {}
-    cost_so_far: dict[str, float] = {}
-    time_so_far: dict[str, datetime.time] = {}
+    reached, came_from, came_by, cost_so_far = best_first_search(
+        graph, graph.stop_ids[start], to_seconds(actual_time), {goal_id}, bounds, stats=stats
+    )
+    return search_result(graph, reached, came_from, came_by, cost_so_far)
 
-    came_from[start] = None
-    cost_so_far[start] = 0
-    time_so_far[start] = actual_time
 
-    while not frontier.empty():
-        current: str = frontier.get()
+def dijkstra_search(graph: Graph, start: str, goal: str, actual_time: Union[datetime.time, int],
+                    stats: Optional[SearchStats] = None):
+    return route_search(graph, start, goal, actual_time, None, stats)
 
-        if current == goal:
-            break
 
-        try:
-            graph.neighbors(current)
-        except KeyError:
-            continue
+def shortest_route(graph: Graph, start: str, goal: str, actual_time: Union[datetime.time, int], heuristic=None,
+                   stats: Optional[SearchStats] = None) -> Optional[Route]:
+    """
+        Same search as route_search, the result is a Route built straight from the search arrays.
+    """
+    if start not in graph.stop_ids or goal not in graph.stop_ids:
+        return None
+    start_id, goal_id = graph.stop_ids[start], graph.stop_ids[goal]
+    bounds = heuristic.bounds(goal_id) if heuristic is not None else None
+    now = to_seconds(actual_time)
 
-        for next in graph.neighbors(current):
-            cost_with_route = graph.cost_time(current, next, time_so_far[current])
-            if cost_with_route is None:
-                continue
-            new_cost = cost_so_far[current] + cost_with_route[0]
+    reached, came_from, came_by, cost_so_far = best_first_search(
+        graph, start_id, now, {goal_id}, bounds, stats=stats
+    )
+    return Route.from_predecessors(graph, came_from, came_by, start_id, goal_id, now)
 
-            if next not in cost_so_far or new_cost < cost_so_far[next]:
-                cost_so_far[next] = new_cost
-                priority = new_cost + heurisitc(graph, current, next)
-                frontier.put(next, priority)
-                came_from[next] = current, cost_with_route[1]
-                time_so_far[next] = cost_with_route[1][2]
 
-    return came_from, cost_so_far
+def dijkstra_route(graph: Graph, start: str, goal: str, actual_time: Union[datetime.time, int],
+                   stats: Optional[SearchStats] = None) -> Optional[Route]:
+    return shortest_route(graph, start, goal, actual_time, None, stats)
 
 
-def a_star_lines(graph: Graph, start: str, goal: str, actual_time: datetime.time):
-    frontier = PriorityQueue()
-    frontier.put(start, 0)
+def one_to_many(graph: Graph, start: str, goals: Optional[list[str]], actual_time: Union[datetime.time, int],
+                stats: Optional[SearchStats] = None):
+    """
+        One search for many goals: same result as dijkstra_search for every goal at once,
+        goals=None searches the whole graph (one to all).
+    """
+    if start not in graph.stop_ids:
+        return {start: None}, {start: 0}
+    goal_ids = None
+    if goals is not None:
+        goal_ids = {graph.stop_ids[goal] for goal in goals if goal in graph.stop_ids}
 
-    came_from: dict[str, (Optional[str], (str, datetime.time))] = {}
-    cost_so_far: dict[str, float] = {}
-    time_so_far: dict[str, datetime.time] = {}
-    line_so_far: dict[str, str] = {}
+    reached, came_from, came_by, cost_so_far = best_first_search(
+        graph, graph.stop_ids[start], to_seconds(actual_time), goal_ids, stats=stats
+    )
+    return search_result(graph, reached, came_from, came_by, cost_so_far)
 
-    came_from[start] = None
-    cost_so_far[start] = 0
-    time_so_far[start] = actual_time
-    line_so_far[start] = ""
 
-    while not frontier.empty():
-        current: str = frontier.get()
+def one_to_all(graph: Graph, start: str, actual_time: Union[datetime.time, int]):
+    return one_to_many(graph, start, None, actual_time)
 
-        if current == goal:
-            break
 
-        try:
-            graph.neighbors(current)
-        except KeyError:
-            continue
+def profile_search(
+        graph: Graph, start: str,
+        from_time: Union[datetime.time, int], to_time: Union[datetime.time, int]
+) -> dict[str, list[(int, int)]]:
+    """
+        Departure time profile: for every stop, the (departure, arrival) pairs worth taking
+        when leaving start between from_time and to_time, sorted by departure.
+        Departures are searched from the latest one, a label that does not arrive earlier
+        than a later departure already did is dropped (self pruning).
+    """
+    if start not in graph.stop_ids:
+        return {}
+    start_id = graph.stop_ids[start]
+    from_time, to_time = to_seconds(from_time), to_seconds(to_time)
+
+    departures = set()
+    for edge in graph.edges_from(start_id):
+        for index, departure in graph.next_departures(edge, from_time, None):
+            if departure > to_time:
+                break
+            departures.add(departure)
+
+    best_arrival: list[float] = [math.inf] * len(graph.stop_names)
+    profiles: dict[int, list[(int, int)]] = {}
+    for departure in sorted(departures, reverse=True):
+        reached, came_from, came_by, cost_so_far = best_first_search(
+            graph, start_id, departure, None, arrival_bound=best_arrival
+        )
+        for stop in reached[1:]:
+            best_arrival[stop] = departure + cost_so_far[stop]
+            profiles.setdefault(stop, []).append((departure, best_arrival[stop]))
 
-        for next in graph.neighbors(current):
-            cost_with_route = graph.cost_lines(current, next, time_so_far[current], line_so_far[current])
-            if cost_with_route is None:
-                continue
-            new_cost = cost_so_far[current] + cost_with_route[0]
+    return {graph.stop_names[stop]: profile[::-1] for stop, profile in profiles.items()}
 
-            if next not in cost_so_far or new_cost < cost_so_far[next]:
-                cost_so_far[next] = new_cost
-                priority = new_cost + heurisitc(graph, current, next)
-                frontier.put(next, priority)
-                came_from[next] = current, cost_with_route[1]
-                time_so_far[next] = cost_with_route[1][2]
-                line_so_far[next] = cost_with_route[1][0]
 
-    return came_from, cost_so_far
+def a_star_time(graph: Graph, start: str, goal: str, actual_time: Union[datetime.time, int], heuristic=None,
+                stats: Optional[SearchStats] = None):
+    """
+        heuristic - lower bounds towards the goal (see heuristics.py), default_heuristic of the graph by default
+    """
+    if heuristic is None:
+        heuristic = default_heuristic(graph)
+    return route_search(graph, start, goal, actual_time, heuristic, stats)
+
+
+def a_star_time_route(graph: Graph, start: str, goal: str, actual_time: Union[datetime.time, int], heuristic=None,
+                      stats: Optional[SearchStats] = None) -> Optional[Route]:
+    if heuristic is None:
+        heuristic = default_heuristic(graph)
+    return shortest_route(graph, start, goal, actual_time, heuristic, stats)
+
+
+def line_state_search(graph: Graph, start_id: int, goal_id: int, now: int, bounds,
+                      stats: Optional[SearchStats] = None):
+    """
+        A* over (stop, line) states: every line serving an edge is tried, not only the one leaving first,
+        so the cost (travel time + LINE_CHANGE for every boarding) is exact.
+        Returns the goal state (None if not reached) and came_from: state -> (previous state, connection).
+    """
+    started = time.perf_counter()
+    table = line_table(graph)
+    edge_segments, segment_lines = table.edge_segments, table.segment_lines
+    settled = relaxed = 0
+
+    first = start_id, -1
+    cost_so_far: dict[(int, int), int] = {first: 0}
+    time_so_far: dict[(int, int), int] = {first: now}
+    came_from: dict[(int, int), ((int, int), int)] = {first: None}
+
+    frontier = IndexedPriorityQueue()
+    frontier.put(first, 0)
+    reached_goal = None
+
+    while not frontier.empty():
+        current = frontier.get()
+        settled += 1
+        stop, line = current
+        if stop == goal_id:
+            reached_goal = current
+            break
+
+        now_time = time_so_far[current]
+        for edge in graph.edges_from(stop):
+            next = graph.adj_targets[edge]
+            for segment in range(edge_segments[edge], edge_segments[edge + 1]):
+                relaxed += 1
+                found = table.next_departure(segment, now_time)
+                if found is None:
+                    continue
+                connection = found[0]
+                next_line = segment_lines[segment]
+                new_cost = cost_so_far[current] + graph.arrivals[connection] - now_time
+                if next_line != line:
+                    new_cost += LINE_CHANGE
+
+                state = next, next_line
+                if new_cost < cost_so_far.get(state, math.inf):
+                    cost_so_far[state] = new_cost
+                    time_so_far[state] = graph.arrivals[connection]
+                    came_from[state] = current, connection
+                    frontier.put(state, new_cost + bounds[next])
+
+    if stats is not None:
+        stats.add(frontier, settled, relaxed, time.perf_counter() - started)
+    return reached_goal, came_from, cost_so_far
+
+
+def a_star_lines(graph: Graph, start: str, goal: str, actual_time: Union[datetime.time, int], heuristic=None,
+                 stats: Optional[SearchStats] = None):
+    """
+        heuristic - lower bounds towards the goal (see heuristics.py), default_heuristic of the graph by default
+        came_from holds the route to goal only (see line_state_search).
+    """
+    if start not in graph.stop_ids:
+        return {start: None}, {start: 0}
+    goal_id = graph.stop_ids.get(goal, -1)
+    if heuristic is None:
+        heuristic = default_heuristic(graph)
+
+    state, came_from, cost_so_far = line_state_search(
+        graph, graph.stop_ids[start], goal_id, to_seconds(actual_time), heuristic.bounds(goal_id), stats
+    )
+
+    names = graph.stop_names
+    came_from_names: dict[str, (Optional[str], (str, int, int))] = {start: None}
+    cost_so_far_names: dict[str, float] = {start: 0}
+    while state is not None and came_from[state] is not None:
+        previous, connection = came_from[state]
+        came_from_names[names[state[0]]] = names[previous[0]], graph.connection(connection)
+        cost_so_far_names[names[state[0]]] = cost_so_far[state]
+        state = previous
+    return came_from_names, cost_so_far_names
+
+
+def a_star_lines_route(graph: Graph, start: str, goal: str, actual_time: Union[datetime.time, int], heuristic=None,
+                       stats: Optional[SearchStats] = None) -> Optional[Route]:
+    if start not in graph.stop_ids or goal not in graph.stop_ids:
+        return None
+    start_id, goal_id = graph.stop_ids[start], graph.stop_ids[goal]
+    if heuristic is None:
+        heuristic = default_heuristic(graph)
+    now = to_seconds(actual_time)
+
+    state, came_from, cost_so_far = line_state_search(graph, start_id, goal_id, now, heuristic.bounds(goal_id), stats)
+    if state is None:
+        return None
+
+    stops = array('i')
+    connections = array('i')
+    while came_from[state] is not None:
+        previous, connection = came_from[state]
+        stops.append(state[0])
+        connections.append(connection)
+        state = previous
+    stops.append(start_id)
+    stops.reverse()
+    connections.reverse()
+    return Route(graph, stops, connections, now)
 
 
 """
     Exercise 2
     a) Tabu search without limits
+    b) Tabu search with neighbourhood moves (swap, 2-opt, insert)
 """
 
 
-def find_solution_time(graph: Graph, start: str, goals: list[str], actual_time: datetime.time):
+class LegCache:
+    """
+        Bounded LRU cache of legs, (path, lines) as returned by reconstruct_path,
+        keyed by (from, to, departure time, criterion).
+        Shared by every route evaluated in every tabu search iteration.
+        A miss by time is one sweep (one_to_many) from the stop to every stop legs were asked for so far,
+        so the legs to the other stops leaving at the same time are kept too (routes changed at one
+        position all leave it at the same time). A miss by lines is one a_star_lines.
+        stats - counters of the searches run on misses
+    """
+
+    def __init__(self, max_size: int = 100000, stats: Optional[SearchStats] = None):
+        self.legs: OrderedDict[(str, str, int, bool), (list[str], list[(str, int, int)])] = OrderedDict()
+        self.max_size = max_size
+        self.stats = stats
+        self.stops: set[str] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def leg(self, graph: Graph, from_stop: str, to_stop: str, now_time: int, by_time: bool) -> \
+            (list[str], list[(str, int, int)]):
+        key = from_stop, to_stop, now_time, by_time
+        if key in self.legs:
+            self.hits += 1
+            self.legs.move_to_end(key)
+            return self.legs[key]
+
+        self.misses += 1
+        if by_time:
+            self.stops.update((from_stop, to_stop))
+            came_from, cost = one_to_many(graph, from_stop, list(self.stops), now_time, self.stats)
+            for stop in self.stops:
+                if stop != from_stop and stop != to_stop:
+                    self.keep((from_stop, stop, now_time, by_time), reconstruct_path(came_from, from_stop, stop))
+        else:
+            came_from, cost = a_star_lines(graph, from_stop, to_stop, now_time, stats=self.stats)
+        result = reconstruct_path(came_from, from_stop, to_stop)
+        self.keep(key, result)
+        return result
+
+    def keep(self, key: (str, str, int, bool), result: (list[str], list[(str, int, int)])):
+        self.legs[key] = result
+        self.legs.move_to_end(key)
+        if len(self.legs) > self.max_size:
+            self.legs.popitem(last=False)
+
+    def arrival(self, graph: Graph, from_stop: str, to_stop: str, now_time: float, by_time: bool) -> float:
+        if now_time == math.inf:
+            return math.inf
+        result = self.leg(graph, from_stop, to_stop, now_time, by_time)
+        if not result:
+            return math.inf
+        return result[1][-1][2]
+
+    def __str__(self):
+        return 'Leg cache: ' + str(self.hits) + ' hits, ' + str(self.misses) + ' misses, ' + \
+            str(len(self.legs)) + ' legs kept'
+
+
+def find_solution(graph: Graph, start: str, goals: list[str], actual_time: Union[datetime.time, int],
+                  by_time: bool, legs: Optional[LegCache] = None):
+    if legs is None:
+        legs = LegCache()
+
     actual = start
-    now_time = actual_time
+    now_time = to_seconds(actual_time)
     for stop in goals:
-        came_from, cost = a_star_time(graph, actual, stop, now_time)
-        path, lines = reconstruct_path(came_from, actual, stop)
+        path, lines = legs.leg(graph, actual, stop, now_time, by_time)
         print(str(path) + ' ==== ' + str(lines))
         actual = stop
-        now_time = lines[len(lines) - 2][2]
+        now_time = lines[-1][2]
 
-    came_from_start, cost = a_star_time(graph, actual, start, now_time)
-    path_back, lines = reconstruct_path(came_from_start, actual, start)
-    now_time = lines[len(lines) - 2][2]
+    path_back, lines = legs.leg(graph, actual, start, now_time, by_time)
+    now_time = lines[-1][2]
 
-    result = time_diff(now_time, actual_time)
+    result = now_time - to_seconds(actual_time)
     print(str(path_back) + ' ==== ' + str(lines))
-    print('Solution time: ' + str(result) + '\n')
+    if by_time:
+        print('Solution time: ' + str(result) + '\n')
+    else:
+        print('Solution lines: ' + str(result) + '\n')
     return result
 
 
-def find_solution_lines(graph: Graph, start: str, goals: list[str], actual_time: datetime.time):
-    actual = start
-    now_time = actual_time
-    for stop in goals:
-        came_from, cost = a_star_lines(graph, actual, stop, now_time)
-        path, lines = reconstruct_path(came_from, actual, stop)
-        print(str(path) + ' ==== ' + str(lines))
-        actual = stop
-        now_time = lines[len(lines) - 2][2]
+def find_solution_time(graph: Graph, start: str, goals: list[str], actual_time: Union[datetime.time, int],
+                       legs: Optional[LegCache] = None):
+    return find_solution(graph, start, goals, actual_time, True, legs)
 
-    came_from_start, cost = a_star_lines(graph, actual, start, now_time)
-    path_back, lines = reconstruct_path(came_from_start, actual, start)
-    now_time = lines[len(lines) - 2][2]
 
-    result = time_diff(now_time, actual_time)
-    print(str(path_back) + ' ==== ' + str(lines))
-    print('Solution lines: ' + result + '\n')
-    return result
+def find_solution_lines(graph: Graph, start: str, goals: list[str], actual_time: Union[datetime.time, int],
+                        legs: Optional[LegCache] = None):
+    return find_solution(graph, start, goals, actual_time, False, legs)
+
+
+"""
+    Evaluating routes in a process pool:
+    every worker gets the graph once (initializer) and keeps its own LegCache,
+    results come back in the order of routes (or chunks of moves), so ties are broken like in the serial version
+"""
+
+worker_graph: Optional[Graph] = None
+worker_legs: Optional[LegCache] = None
+
+
+def init_route_worker(graph: Graph):
+    global worker_graph, worker_legs
+    worker_graph = graph
+    worker_legs = LegCache()
+
+
+def evaluate_route(task: (str, list[str], int, bool)) -> float:
+    start, route, now, by_time = task
+    return route_arrivals(worker_graph, start, list(route), now, by_time, worker_legs)[-1] - now
+
+
+def evaluate_moves(task: (str, int, bool, list[float], float, list[(list[str], int, bool)])) -> \
+        (Optional[int], Optional[list[float]]):
+    start, now, by_time, current_arrivals, best_cost, candidates = task
+    return best_candidate(worker_graph, start, now, by_time, worker_legs, current_arrivals, best_cost, candidates)
+
+
+def route_pool(graph: Graph, workers: Optional[int] = None) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(workers, initializer=init_route_worker, initargs=(graph,))
+
+
+def evaluate_routes(pool: ProcessPoolExecutor, start: str, routes: list, now: int, by_time: bool) -> list[float]:
+    chunksize = max(1, len(routes) // 64)
+    return list(pool.map(evaluate_route, [(start, route, now, by_time) for route in routes], chunksize=chunksize))
+
+
+def evaluate_candidates(pool: ProcessPoolExecutor, start: str, now: int, by_time: bool, current_arrivals: list[float],
+                        best_cost: float, candidates: list[(list[str], int, bool)]) -> \
+        (Optional[int], Optional[list[float]]):
+    """
+        best_candidate over chunks of candidates in parallel, one chunk per worker task:
+        the cheapest of the chunk winners, the first one on ties.
+    """
+    size = -(-len(candidates) // (2 * (os.cpu_count() or 1)))
+    tasks = [(start, now, by_time, current_arrivals, best_cost, candidates[low:low + size])
+             for low in range(0, len(candidates), size)]
+
+    best_index, best_arrivals = None, None
+    for low, (index, arrivals) in zip(range(0, len(candidates), size), pool.map(evaluate_moves, tasks)):
+        if index is not None and (best_arrivals is None or arrivals[-1] < best_arrivals[-1]):
+            best_index, best_arrivals = low + index, arrivals
+    return best_index, best_arrivals
 
 
 def get_best_neighbour_without_limits(
         graph: Graph,
         start: str, goals: list[str],
         tabu_history, tabu_limit: int, aspiration: int,
-        actual_time: datetime.time,
-        by_time: bool
+        actual_time: Union[datetime.time, int],
+        by_time: bool,
+        legs: Optional[LegCache] = None,
+        pool: Optional[ProcessPoolExecutor] = None
 ):
     best_neighbour = None
     best_neighbour_cost = math.inf
 
     possibilities = list(itertools.permutations(goals, len(goals)))
-    for route in possibilities:
+    if pool is not None:
+        costs = evaluate_routes(pool, start, possibilities, to_seconds(actual_time), by_time)
+
+    for index, route in enumerate(possibilities):
 
         # Take a route and decide which cost
-        if by_time:
-            actual_solution = find_solution_time(graph, start, list(route), actual_time)
+        if pool is not None:
+            actual_solution = costs[index]
         else:
-            actual_solution = find_solution_lines(graph, start, list(route), actual_time)
+            actual_solution = find_solution(graph, start, list(route), actual_time, by_time, legs)
 
         # This route is tabu
         if route in tabu_history:
@@ -365,13 +1012,19 @@ def tabu_search_without_limits(
     start, goals, actual_time,
     num_iter,
     tabu_limit, tabu_history, aspiration,
-    by_time
+    by_time,
+    legs: Optional[LegCache] = None,
+    pool: Optional[ProcessPoolExecutor] = None
 ):
+    """
+        With pool given (see route_pool), routes of every iteration are evaluated in parallel.
+    """
+    # Legs already solved are shared by every route in every iteration
+    if legs is None:
+        legs = LegCache()
+
     best_solution = goals
-    if by_time:
-        best_cost = find_solution_time(graph, start, best_solution, actual_time)
-    else:
-        best_cost = find_solution_lines(graph, start, best_solution, actual_time)
+    best_cost = find_solution(graph, start, best_solution, actual_time, by_time, legs)
     states = [best_cost]
 
     historical_best = best_solution
@@ -387,7 +1040,7 @@ def tabu_search_without_limits(
             graph,
             start, goals,
             tabu_history, tabu_limit, aspiration,
-            actual_time, by_time
+            actual_time, by_time, legs, pool
         )
 
         if best_cost <= historical_best_cost:
@@ -395,3 +1048,140 @@ def tabu_search_without_limits(
             historical_best_cost = best_cost
         states.append(best_cost)
     return historical_best, historical_best_cost, states
+
+
+def neighbourhood_moves(size: int, neighbourhood: str) -> list[(str, int, int)]:
+    """
+        Every move of the neighbourhood for a route of given size:
+        'swap', '2-opt', 'insert' or 'all' of them.
+    """
+    kinds = ['swap', '2-opt', 'insert'] if neighbourhood == 'all' else [neighbourhood]
+    moves = []
+    for kind in kinds:
+        if kind not in ('swap', '2-opt', 'insert'):
+            raise ValueError('Unknown neighbourhood: ' + kind)
+        for i in range(size):
+            for j in range(size):
+                if i < j or (kind == 'insert' and i != j):
+                    moves.append((kind, i, j))
+    return moves
+
+
+def apply_move(route: list[str], move: (str, int, int)) -> (list[str], int):
+    """
+        Returns the changed route and the first position that changed.
+    """
+    kind, i, j = move
+    route = list(route)
+    if kind == 'swap':
+        route[i], route[j] = route[j], route[i]
+    elif kind == '2-opt':
+        route[i:j + 1] = reversed(route[i:j + 1])
+    else:
+        route.insert(j, route.pop(i))
+    return route, min(i, j)
+
+
+def route_arrivals(graph: Graph, start: str, route: list[str], now: int, by_time: bool, legs: LegCache,
+                   arrivals: Optional[list[float]] = None, changed: int = 0,
+                   bound: Optional[float] = None) -> list[float]:
+    """
+        Time of arrival at every stop of the route, the last one back at start.
+        Legs before the changed position are taken from arrivals of the route it was changed from.
+        Evaluation stops once a time reaches bound, the returned list is shorter then.
+    """
+    result = arrivals[:changed] if changed else []
+    now_time = result[-1] if result else now
+    actual = route[changed - 1] if changed else start
+
+    for stop in route[changed:] + [start]:
+        now_time = legs.arrival(graph, actual, stop, now_time, by_time)
+        if bound is not None and now_time >= bound:
+            break
+        result.append(now_time)
+        actual = stop
+    return result
+
+
+def best_candidate(graph: Graph, start: str, now: int, by_time: bool, legs: LegCache, current_arrivals: list[float],
+                   best_cost: float, candidates: list[(list[str], int, bool)]) -> (Optional[int], Optional[list[float]]):
+    """
+        Index and arrivals (see route_arrivals) of the cheapest candidate (route, changed position, tabu),
+        the first one on ties; (None, None) if there is none. Candidates are evaluated from the changed
+        position and only up to the cost of the best one so far. A tabu candidate counts only if it
+        costs less than best_cost (aspiration).
+    """
+    best_index, best_arrivals = None, None
+    best_move_cost = math.inf
+    for index, (route, changed, tabu) in enumerate(candidates):
+        arrivals = route_arrivals(
+            graph, start, route, now, by_time, legs, current_arrivals, changed, now + best_move_cost
+        )
+        if len(arrivals) <= len(route):
+            continue  # not better than the best move so far
+        cost = arrivals[-1] - now
+        if tabu and cost >= best_cost:
+            continue
+        best_index, best_arrivals, best_move_cost = index, arrivals, cost
+    return best_index, best_arrivals
+
+
+def tabu_search(
+        graph: Graph,
+        start: str, goals: list[str], actual_time: Union[datetime.time, int],
+        num_iter: int, tabu_limit: int,
+        by_time: bool,
+        neighbourhood: str = 'swap', sample_size: Optional[int] = None, seed: Optional[int] = None,
+        legs: Optional[LegCache] = None,
+        pool: Optional[ProcessPoolExecutor] = None
+):
+    """
+        Tabu search over moves of the neighbourhood instead of every permutation.
+        Each iteration takes the best of sample_size random moves (all moves for None),
+        a move touching the same two stops is tabu for tabu_limit iterations unless
+        it gives a new best route (aspiration).
+        With pool given (see route_pool), chunks of the candidates are evaluated in parallel,
+        incrementally like in the serial version; the chosen moves stay the same.
+    """
+    if legs is None:
+        legs = LegCache()
+    rng = random.Random(seed)
+    now = to_seconds(actual_time)
+
+    current = list(goals)
+    current_arrivals = route_arrivals(graph, start, current, now, by_time, legs)
+    best_solution, best_cost = current, current_arrivals[-1] - now
+    states = [best_cost]
+
+    moves = neighbourhood_moves(len(goals), neighbourhood)
+    tabu: dict[frozenset, int] = {}  # stops of a move -> last iteration it is tabu
+
+    for iteration in range(num_iter):
+        if sample_size is None or sample_size >= len(moves):
+            candidates = moves
+        else:
+            candidates = rng.sample(moves, sample_size)
+
+        routes = []
+        for move in candidates:
+            route, changed = apply_move(current, move)
+            stops = frozenset((current[move[1]], current[move[2]]))
+            routes.append((route, changed, tabu.get(stops, -1) >= iteration))
+
+        if pool is not None:
+            index, arrivals = evaluate_candidates(pool, start, now, by_time, current_arrivals, best_cost, routes)
+        else:
+            index, arrivals = best_candidate(graph, start, now, by_time, legs, current_arrivals, best_cost, routes)
+        if index is None:
+            break
+
+        move = candidates[index]
+        stops = frozenset((current[move[1]], current[move[2]]))
+        current, current_arrivals = routes[index][0], arrivals
+        best_move_cost = arrivals[-1] - now
+        tabu[stops] = iteration + tabu_limit
+        if best_move_cost < best_cost:
+            best_solution, best_cost = current, best_move_cost
+        states.append(best_move_cost)
+
+    return best_solution, best_cost, states
@@ -0,0 +1,37 @@
+from connection_scan import csa_search
+from graph_loader import build_graph, read_connections
+from structures_functions import a_star_time, dijkstra_search
+
+"""
+    Loading connection_graph.csv, python -m pytest
+"""
+
+HEADER = ',id,company,line,departure_time,arrival_time,start_stop,end_stop,' \
+         'start_stop_lat,start_stop_lon,end_stop_lat,end_stop_lon\n'
+
+
+def write_csv(path, rides: list[(str, str, str, str, str)]) -> str:
+    """
+        rides as (line, departure, arrival, from, to), stops 1 km apart on a line.
+    """
+    coords = {'a': (51.10, 17.00), 'b': (51.109, 17.00), 'c': (51.118, 17.00)}
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(HEADER)
+        for i, (line, departure, arrival, from_stop, to_stop) in enumerate(rides):
+            f.write('%d,%d,MPK,%s,%s,%s,%s,%s,%f,%f,%f,%f\n' % (
+                i, i, line, departure, arrival, from_stop, to_stop, *coords[from_stop], *coords[to_stop]
+            ))
+    return str(path)
+
+
+def test_trip_goes_on_past_midnight(tmp_path):
+    graph = build_graph(read_connections(write_csv(tmp_path / 'connection_graph.csv', [
+        ('N', '23:58:00', '00:03:00', 'a', 'b'),
+        ('N', '00:03:00', '00:06:00', 'b', 'c'),
+    ])))
+    evening = 23 * 3600 + 50 * 60
+    for search in (dijkstra_search, a_star_time, csa_search):
+        assert search(graph, 'a', 'c', evening)[1]['c'] == 16 * 60
+
+    # The same ride still runs early in the morning of the service day
+    assert dijkstra_search(graph, 'b', 'c', 0)[1]['c'] == 6 * 60
@@ -0,0 +1,171 @@
+import math
+
+from structures_functions import DAY, Graph, LegCache, dijkstra_search, dijkstra_route, a_star_time, a_star_lines, \
+    a_star_lines_route, line_table, profile_search
+from connection_scan import csa_route, csa_search
+from raptor import raptor_search
+from bidirectional import bidirectional_route, bidirectional_search
+from heuristics import Landmarks, default_heuristic
+
+"""
+    Searches on small hand made timetables, python -m pytest
+"""
+
+
+def timetable(connections: list[(str, str, int, int, str)], coords: dict[str, (float, float)] = None) -> Graph:
+    """
+        Graph of (from, to, departure, arrival, line) rides, times in seconds.
+    """
+    graph = Graph()
+    rows = []
+    for from_stop, to_stop, departure, arrival, line in connections:
+        rows.append((graph.stop_id(from_stop), graph.stop_id(to_stop), departure, arrival, graph.line_id(line)))
+    rows.sort()
+    graph.set_connections(*[list(column) for column in zip(*rows)])
+    for stop, coord in (coords or {}).items():
+        graph.width_height[stop] = coord
+    return graph
+
+
+def zero_second_trip() -> Graph:
+    """
+        One trip d -> c -> b -> a, the last two rides take 0 seconds (minute rounded timetable);
+        b and a are interned first, so their rides come first in storage order.
+    """
+    return timetable([
+        ('b', 'a', 660, 660, '1'),
+        ('c', 'b', 660, 660, '1'),
+        ('d', 'c', 0, 660, '1'),
+    ])
+
+
+def test_csa_follows_zero_second_rides():
+    graph = zero_second_trip()
+    assert dijkstra_search(graph, 'd', 'a', 0)[1]['a'] == 660
+    assert csa_search(graph, 'd', 'a', 0)[1]['a'] == 660
+
+    route = csa_route(graph, 'd', 'a', 0)
+    assert [graph.stop_names[stop] for stop in route.stops] == ['d', 'c', 'b', 'a']
+    assert route.transfers == 0
+
+
+def test_raptor_keeps_zero_second_rides_in_one_trip():
+    graph = zero_second_trip()
+    assert [journey[:2] for journey in raptor_search(graph, 'd', 'a', 0)] == [(660, 0)]
+    assert a_star_lines_route(graph, 'd', 'a', 0).transfers == 0
+
+
+def test_speed_bound_with_zero_second_ride_is_admissible():
+    # a, b, g on a line 500 m and 1500 m apart, b -> g takes 0 seconds
+    graph = timetable([
+        ('a', 'b', 0, 540, '1'),
+        ('b', 'g', 540, 540, '1'),
+        ('a', 'g', 0, 570, '2'),
+    ], {'a': (51.0, 17.0), 'b': (51.0045, 17.0), 'g': (51.0135, 17.0)})
+    assert dijkstra_search(graph, 'a', 'g', 0)[1]['g'] == 540
+    assert a_star_time(graph, 'a', 'g', 0)[1]['g'] == 540
+    assert a_star_lines_route(graph, 'a', 'g', 0).travel_time == 540
+
+    # SpeedBound is 0 everywhere here, so the default is Landmarks: not 0, still a lower bound
+    heuristic = default_heuristic(graph)
+    assert isinstance(heuristic, Landmarks)
+    bounds = heuristic.bounds(graph.stop_ids['g'])
+    assert 0 < bounds[graph.stop_ids['a']] <= 540
+    assert bounds[graph.stop_ids['b']] == 0
+
+
+def test_route_splits_legs_at_a_later_vehicle_of_the_same_line():
+    # Off at b at 24:03, the next N leaves b at 24:10
+    graph = timetable([
+        ('a', 'b', 86280, 86580, 'N'),
+        ('b', 'c', 87000, 87300, 'N'),
+    ])
+    route = dijkstra_route(graph, 'a', 'c', 86000)
+    legs = route.to_dict()['legs']
+    assert [(leg['from'], leg['to'], leg['rides']) for leg in legs] == [('a', 'b', 1), ('b', 'c', 1)]
+    assert route.transfers == 1
+
+
+def test_next_departures_of_an_edge():
+    graph = timetable([
+        ('a', 'b', 600, 900, '1'),
+        ('a', 'b', 1200, 1500, '2'),
+        ('a', 'b', 1800, 2100, '1'),
+    ])
+    edge = graph.adj_offsets[graph.stop_ids['a']]
+    departures = lambda found: [departure for index, departure in found]
+
+    assert departures(graph.next_departures(edge, 700, 2)) == [1200, 1800]
+    assert departures(graph.next_departures(edge, 600, None)) == [600, 1200, 1800]
+    assert graph.next_departures(edge, 1900) == []
+    assert graph.next_departure(edge, 1900) is None
+    assert graph.next_departure(edge, 1200) == (1, 1200)
+
+    # wrap: after the last departure come the ones of the next day, one day of them at most
+    assert departures(graph.next_departures(edge, 1900, 2, wrap=True)) == [DAY + 600, DAY + 1200]
+    assert departures(graph.next_departures(edge, 1500, None, wrap=True)) == [1800, DAY + 600, DAY + 1200]
+    assert graph.next_departure(edge, 2 * DAY + 700, wrap=True) == (1, 2 * DAY + 1200)
+
+    table = line_table(graph)
+    segments = range(table.edge_segments[edge], table.edge_segments[edge + 1])
+    assert {graph.lines[table.segment_lines[segment]]: table.next_departures(segment, 700, None)
+            for segment in segments} == {'1': [(2, 1800)], '2': [(1, 1200)]}
+    assert [table.next_departure(segment, 1900, wrap=True) for segment in segments] == [(0, DAY + 600), (1, DAY + 1200)]
+
+
+def test_a_star_lines_waits_for_a_later_trip_of_its_line():
+    # Line 2 leaves first, waiting for the next 1 avoids a change at b
+    graph = timetable([
+        ('a', 'b', 0, 300, '1'),
+        ('b', 'c', 360, 600, '2'),
+        ('b', 'c', 900, 1200, '1'),
+    ])
+    assert a_star_lines(graph, 'a', 'c', 0)[1]['c'] == 1200 + 600 * 60
+    route = a_star_lines_route(graph, 'a', 'c', 0)
+    assert [leg['line'] for leg in route.to_dict()['legs']] == ['1', '1']
+
+
+def test_bidirectional_search_matches_dijkstra():
+    graph = timetable([
+        ('a', 'b', 0, 300, '1'),
+        ('b', 'c', 360, 600, '1'),
+        ('a', 'c', 100, 900, '2'),
+        ('c', 'd', 700, 800, '3'),
+        ('d', 'a', 900, 1000, '3'),
+    ])
+    for goal in 'bcd':
+        assert bidirectional_search(graph, 'a', goal, 0)[1][goal] == dijkstra_search(graph, 'a', goal, 0)[1][goal]
+    assert [graph.stop_names[stop] for stop in bidirectional_route(graph, 'a', 'd', 0).stops] == ['a', 'b', 'c', 'd']
+    assert 'a' not in bidirectional_search(graph, 'b', 'a', 1000)[1]
+
+
+def test_profile_search_keeps_departures_worth_taking():
+    graph = timetable([
+        ('a', 'b', 0, 600, '1'),
+        ('a', 'b', 300, 700, '1'),
+        ('a', 'b', 900, 1000, '1'),
+        ('b', 'c', 800, 900, '2'),
+        ('a', 'd', 1200, 1300, '3'),
+    ])
+    profiles = profile_search(graph, 'a', 0, 1000)
+    # d only by waiting at a for the ride after to_time, from the last departure
+    assert profiles == {'b': [(0, 600), (300, 700), (900, 1000)], 'c': [(300, 900)], 'd': [(900, 1300)]}
+    for stop, profile in profiles.items():
+        for departure, arrival in profile:
+            assert departure + dijkstra_search(graph, 'a', stop, departure)[1][stop] == arrival
+
+
+def test_leg_cache_sweeps_once_per_origin_and_time():
+    graph = timetable([
+        ('a', 'b', 0, 600, '1'),
+        ('b', 'c', 800, 900, '2'),
+        ('b', 'd', 700, 1000, '3'),
+        ('c', 'a', 1000, 1200, '2'),
+    ])
+    legs = LegCache()
+    legs.leg(graph, 'a', 'b', 0, True)
+    legs.leg(graph, 'b', 'c', 600, True)
+    assert legs.leg(graph, 'b', 'a', 600, True)[1][-1][2] == 1200  # kept by the sweep from b at 600
+    assert (legs.hits, legs.misses) == (1, 2)
+    assert legs.arrival(graph, 'b', 'd', 600, True) == 1000
+    assert legs.arrival(graph, 'd', 'a', 1000, True) == math.inf
@@ -1,21 +1,39 @@
-def min_max(board, player, depth, heuristic, nodes_visited=0):
-    nodes_visited += 1
+import time
 
+from transposition import EXACT, LOWER, UPPER
+
+
+class SearchTimeout(Exception):
+    """
+        Raised by alfa_beta when the deadline of the search has passed.
+    """
+
+
+def min_max(board, player, depth, heuristic):
+    """
+        Min max search from the board's current player. Moves are made with
+        do_move and taken back with undo_move, so the board is left as it was.
+        The player stays the same in the whole tree: the heuristic is always
+        counted for them, their moves maximize and the adversary's minimize.
+
+        Returns:
+        - (best move, its score, number of nodes searched)
+    """
     if depth == 0:
-        return None, heuristic(board, player), nodes_visited
+        return None, heuristic(board, player), 1
 
-    moves = board.get_legal_moves()
+    moves = get_moves(board)
     if len(moves) == 0:
-        return None, heuristic(board, player), nodes_visited
+        return None, heuristic(board, player), 1
 
+    nodes_visited = 1
     if board.current_player == player:
         best_move = None
         best_score = float('-inf')
         for move in moves:
-            board.move = move
-            board.make_move_without_drawing()
-
-            some_move, score, nodes = min_max(board, change_player(player), depth - 1, heuristic, nodes_visited)
+            undo = board.do_move(move)
+            some_move, score, nodes = min_max(board, player, depth - 1, heuristic)
+            board.undo_move(undo)
             if score > best_score:
                 best_move = move
                 best_score = score
@@ -25,10 +43,9 @@ def min_max(board, player, depth, heuristic, nodes_visited=0):
         best_move = None
         best_score = float('inf')
         for move in moves:
-            board.move = move
-            board.make_move_without_drawing()
-
-            some_move, score, nodes = min_max(board, change_player(player), depth - 1, heuristic)
+            undo = board.do_move(move)
+            some_move, score, nodes = min_max(board, player, depth - 1, heuristic)
+            board.undo_move(undo)
             if score < best_score:
                 best_move = move
                 best_score = score
@@ -36,57 +53,156 @@ def min_max(board, player, depth, heuristic, nodes_visited=0):
         return best_move, best_score, nodes_visited
 
 
-def alfa_beta(board, player, depth, heuristic, alpha=float('-inf'), beta=float('inf'), nodes_visited=0):
-    nodes_visited += 1
+def alfa_beta(board, player, depth, heuristic, alpha=float('-inf'), beta=float('inf'), table=None,
+              deadline=None, first_move=None, ordering=None):
+    """
+        Min max with alpha beta pruning, the board and the player as in min_max.
+        With a TranspositionTable, positions searched at least as deep before
+        return the stored score when it is exact or outside (alpha, beta),
+        otherwise the stored best move is searched first. first_move, if
+        legal, is searched first at the root. With a MoveOrdering, the other
+        moves are sorted by it and the moves cutting the search off update it.
+        The table is keyed by the position only, so the heuristic has to depend
+        on the position alone (not on board.move, the move that led to it).
 
-    if depth == 0:
-        return None, heuristic(board, player), nodes_visited
+        Raises SearchTimeout after the deadline (time.perf_counter() value),
+        the board is still left as it was.
 
-    moves = board.get_legal_moves()
-    if len(moves) == 0:
-        return None, heuristic(board, player), nodes_visited
+        Returns:
+        - (best move, its score, number of nodes searched)
+    """
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
 
+    if depth == 0:
+        return None, heuristic(board, player), 1
+
+    key = None
+    table_move = None
+    if table is not None:
+        key = board.key ^ board.geometry.side_keys[board.current_player]
+        entry = table.probe(key)
+        if entry is not None:
+            entry_key, entry_depth, flag, score, table_move, generation = entry
+            if entry_depth >= depth and (flag == EXACT or
+                                         flag == LOWER and score >= beta or
+                                         flag == UPPER and score <= alpha):
+                table.cutoffs += 1
+                return table_move, score, 1
+
+    moves = get_moves(board)
+    if len(moves) == 0:
+        return None, heuristic(board, player), 1
+    if first_move is None:
+        first_move = table_move
+    ply = sum(board.num_tiles)
+    if ordering is not None:
+        moves = ordering.order(moves, board.current_player, ply, first_move)
+    elif first_move in moves:
+        moves.remove(first_move)
+        moves.insert(0, first_move)
+
+    nodes_visited = 1
+    alpha_start, beta_start = alpha, beta
     if board.current_player == player:
         best_move = None
         best_score = float('-inf')
         for move in moves:
-            board.move = move
-            board.make_move_without_drawing()
-            board.current_player = change_player(player)
-            some_move, score, nodes = alfa_beta(
-                board, change_player(player), depth - 1, heuristic, alpha, beta
-            )
+            undo = board.do_move(move)
+            try:
+                some_move, score, nodes = alfa_beta(
+                    board, player, depth - 1, heuristic, alpha, beta, table, deadline, ordering=ordering
+                )
+            finally:
+                board.undo_move(undo)
+            nodes_visited += nodes
             if score > best_score:
                 best_move = move
                 best_score = score
             alpha = max(alpha, best_score)
 
             if beta <= alpha:
+                if ordering is not None:
+                    ordering.cutoff(move, board.current_player, ply, depth)
                 break
-
-            nodes_visited += nodes
-
-        return best_move, best_score, nodes_visited
     else:
         best_move = None
         best_score = float('inf')
         for move in moves:
-            board.move = move
-            board.make_move_without_drawing()
-            board.current_player = change_player(player)
-            some_move, score, nodes = alfa_beta(
-                board, change_player(player), depth - 1, heuristic, alpha, beta
-            )
+            undo = board.do_move(move)
+            try:
+                some_move, score, nodes = alfa_beta(
+                    board, player, depth - 1, heuristic, alpha, beta, table, deadline, ordering=ordering
+                )
+            finally:
+                board.undo_move(undo)
+            nodes_visited += nodes
             if score < best_score:
                 best_move = move
                 best_score = score
             beta = min(beta, best_score)
 
             if beta <= alpha:
+                if ordering is not None:
+                    ordering.cutoff(move, board.current_player, ply, depth)
                 break
 
-            nodes_visited += nodes
-        return best_move, best_score, nodes_visited
+    if table is not None:
+        if best_score <= alpha_start:
+            flag = UPPER
+        elif best_score >= beta_start:
+            flag = LOWER
+        else:
+            flag = EXACT
+        table.store(key, depth, flag, best_score, best_move)
+    return best_move, best_score, nodes_visited
+
+
+def iterative_deepening(board, player, heuristic, time_limit, table=None, max_depth=None, ordering=None):
+    """
+        Searches with alfa_beta to depth 1, 2, 3... until time_limit seconds
+        pass, starting every search from the best move of the one before.
+        Depth 1 is always completed, so there is a move to make; deeper
+        searches stop at the end of the game (number of empty squares).
+
+        Returns:
+        - (best move, its score, depth of the last completed search,
+           number of nodes searched in the completed searches)
+    """
+    deadline = time.perf_counter() + time_limit
+    empty = board.n ** 2 - sum(board.num_tiles)
+    if max_depth is None or max_depth > empty:
+        max_depth = max(empty, 1)
+
+    best_move, best_score, nodes_visited = alfa_beta(board, player, 1, heuristic, table=table, ordering=ordering)
+    depth = 1
+    while depth < max_depth:
+        try:
+            move, score, nodes = alfa_beta(
+                board, player, depth + 1, heuristic, table=table, deadline=deadline, first_move=best_move,
+                ordering=ordering
+            )
+        except SearchTimeout:
+            break
+        best_move, best_score = move, score
+        nodes_visited += nodes
+        depth += 1
+    return best_move, best_score, depth, nodes_visited
+
+
+def get_moves(board):
+    """
+        Legal moves of the board's current player. If they have none but the
+        adversary has some, the only move is a pass (); if neither of them
+        has a move, the game is over and there are no moves.
+    """
+    moves = board.get_legal_moves()
+    if len(moves) == 0:
+        board.current_player = change_player(board.current_player)
+        if board.has_legal_move():
+            moves = [()]
+        board.current_player = change_player(board.current_player)
+    return moves
 
 
 def change_player(player):
@@ -0,0 +1,146 @@
+"""
+This module contains bitboard functions used by Othello game.
+The tiles of one player are a single integer: square (row, col) is
+bit row * n + col, so shifting by n moves a row down and shifting by 1
+moves a column right (with masks keeping tiles from wrapping around
+to the next row).
+"""
+
+import random
+from functools import lru_cache
+
+# Same directions as MOVE_DIRS in othello.py, (row, col) steps
+DIRECTIONS = [(-1, -1), (-1, 0), (-1, +1),
+              (0, -1), (0, +1),
+              (+1, -1), (+1, 0), (+1, +1)]
+
+
+class Geometry:
+    """ Geometry class.
+        Attributes: n, an integer for nxn board
+                    full, an integer with bits of all the squares set
+                    shifts, a list of (shift, mask) tuples, one for every
+                    direction: a positive shift moves tiles to higher bits,
+                    mask drops the ones which wrapped around a row
+                    keys, two lists (one for every player) of random 64-bit
+                    Zobrist keys of the squares
+                    flip_keys, a list of keys to xor when a tile is flipped
+                    side_keys, a list of keys of the player to move
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.full = (1 << n * n) - 1
+
+        first_col = 0
+        for row in range(n):
+            first_col |= 1 << row * n
+        last_col = first_col << (n - 1)
+
+        self.shifts = []
+        for d_row, d_col in DIRECTIONS:
+            mask = self.full
+            if d_col == 1:
+                mask &= ~first_col
+            elif d_col == -1:
+                mask &= ~last_col
+            self.shifts.append((d_row * n + d_col, mask))
+
+        # Fixed seed, so the keys (and hashes) are the same in every game
+        rng = random.Random(n)
+        self.keys = [[rng.getrandbits(64) for _ in range(n * n)] for _ in (0, 1)]
+        self.flip_keys = [black ^ white for black, white in zip(*self.keys)]
+        self.side_keys = [rng.getrandbits(64) for _ in (0, 1)]
+
+
+@lru_cache(maxsize=None)
+def geometry(n):
+    """ Function geometry
+        Parameters: n (integer)
+        Returns: Geometry of the nxn board, built once for every n
+    """
+    return Geometry(n)
+
+
+def shift(tiles, step, mask):
+    if step > 0:
+        return (tiles << step) & mask
+    return (tiles >> -step) & mask
+
+
+def legal_moves(geo, own, opp):
+    """ Function legal_moves
+        Parameters: geo (Geometry), own (integer), opp (integer)
+        Returns: an integer with bits of all the legal moves set
+
+        Does: For every direction, follows runs of the adversary's tiles
+              starting next to own tiles; an empty square right after
+              such a run is a legal move.
+    """
+    empty = geo.full & ~(own | opp)
+    moves = 0
+    for step, mask in geo.shifts:
+        run = shift(own, step, mask) & opp
+        for _ in range(geo.n - 3):
+            run |= shift(run, step, mask) & opp
+        moves |= shift(run, step, mask) & empty
+    return moves
+
+
+def flips(geo, own, opp, square):
+    """ Function flips
+        Parameters: geo (Geometry), own (integer), opp (integer),
+                    square (integer with the bit of the move set)
+        Returns: an integer with bits of the adversary's tiles to flip
+                 (0 if the move is not legal)
+    """
+    result = 0
+    for step, mask in geo.shifts:
+        run = 0
+        tile = shift(square, step, mask)
+        while tile & opp:
+            run |= tile
+            tile = shift(tile, step, mask)
+        if tile & own:
+            result |= run
+    return result
+
+
+def squares(tiles, n):
+    """ Function squares
+        Parameters: tiles (integer), n (integer)
+        Returns: a list of (row, col) tuples of the set bits, in row-major order
+    """
+    return [divmod(index, n) for index in indices(tiles)]
+
+
+def zobrist(geo, tiles):
+    """ Function zobrist
+        Parameters: geo (Geometry), tiles (list of two integers)
+        Returns: Zobrist hash of the tiles, xor of the keys of all the
+                 squares taken by each player
+    """
+    key = 0
+    for player in (0, 1):
+        for index in indices(tiles[player]):
+            key ^= geo.keys[player][index]
+    return key
+
+
+def flip_key(geo, flipped):
+    """ Function flip_key
+        Parameters: geo (Geometry), flipped (integer)
+        Returns: the key to xor with a hash when tiles of flipped change
+                 their player
+    """
+    key = 0
+    for index in indices(flipped):
+        key ^= geo.flip_keys[index]
+    return key
+
+
+def indices(tiles):
+    while tiles:
+        lowest = tiles & -tiles
+        yield lowest.bit_length() - 1
+        tiles ^= lowest
@@ -0,0 +1,91 @@
+"""
+This module compares nodes searched by alfa_beta with and without move
+ordering and the transposition table, on the positions of random games
+(the same ones for every seed), without drawing anything.
+
+python compare_ordering.py [depth] [games]
+"""
+
+import random
+import sys
+
+import othello
+from algorithms import alfa_beta, get_moves
+from heuristics import tiles_and_corners
+from ordering import MoveOrdering
+from transposition import TranspositionTable
+
+
+def random_positions(games, seed=0, n=8):
+    """ Function random_positions
+        Parameters: games (integer), seed (integer), n (integer)
+        Returns: a list of nested lists (boards) and current players of
+                 every position of random games with a legal move
+    """
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(games):
+        game = othello.Othello(n)
+        rows = [[0] * n for _ in range(n)]
+        rows[n // 2 - 1][n // 2 - 1] = rows[n // 2][n // 2] = 2
+        rows[n // 2 - 1][n // 2] = rows[n // 2][n // 2 - 1] = 1
+        game.board = rows
+        while True:
+            moves = get_moves(game)
+            if len(moves) == 0:
+                break
+            if moves != [()]:
+                positions.append((game.board, game.current_player))
+            game.do_move(rng.choice(moves))
+    return positions
+
+
+def count_nodes(positions, depth, use_table, use_ordering):
+    """ Function count_nodes
+        Parameters: positions (list), depth (integer), use_table (boolean),
+                    use_ordering (boolean)
+        Returns: a dictionary of number of tiles on the board to the total
+                 number of nodes searched in positions with that many tiles
+    """
+    nodes_by_tiles = {}
+    for rows, player in positions:
+        game = othello.Othello(len(rows))
+        game.board = rows
+        game.num_tiles = [sum(row.count(1) for row in rows), sum(row.count(2) for row in rows)]
+        game.current_player = player
+        game.move = (0, 0)
+        table = TranspositionTable() if use_table else None
+        ordering = MoveOrdering(game.n) if use_ordering else None
+        nodes = 0
+        # Searches to depth 1, 2, ... as the computer does, so the table and
+        # the ordering have the results of the shallower searches
+        for d in range(1, depth + 1):
+            nodes += alfa_beta(game, player, d, tiles_and_corners, table=table, ordering=ordering)[2]
+        tiles = sum(game.num_tiles)
+        nodes_by_tiles[tiles] = nodes_by_tiles.get(tiles, 0) + nodes
+    return nodes_by_tiles
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    games = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    positions = random_positions(games)
+
+    variants = [('ROW_MAJOR', False, False), ('TABLE', True, False),
+                ('ORDERING', False, True), ('TABLE_AND_ORDERING', True, True)]
+    totals = {}
+    for name, use_table, use_ordering in variants:
+        nodes_by_tiles = count_nodes(positions, depth, use_table, use_ordering)
+        totals[name] = sum(nodes_by_tiles.values())
+        print(name + ' (depth ' + str(depth) + ', ' + str(len(positions)) + ' positions):')
+        for tiles in sorted(nodes_by_tiles):
+            print('Nodes searched,' + str(nodes_by_tiles[tiles]) + ',Tiles on board,' + str(tiles))
+
+    print('TOTAL:')
+    for name, use_table, use_ordering in variants:
+        print(name + ',' + str(totals[name]) + ',' +
+              str(round(100 * totals[name] / totals['ROW_MAJOR'], 1)) + '%')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,29 +1,25 @@
 def more_tiles(board, player):
     """
         Heuristic function that returns a score for actual player's situation.
-        It counts tiles.
+        It counts tiles: player's minus the adversary's.
 
         Parameters:
-        - board (Board)     : the current board
+        - board (Othello)   : the current board
         - player (number)   : player for who tiles are counted
 
         Returns:
         - score (int)       : the score for the move
     """
-    score = 0
-    for row in range(board.n):
-        for col in range(board.n):
-            if board.board[row][col] == player + 1:
-                score += 1
-            elif board.board[row][col] == (player + 2) % 2:
-                score -= 1
-    return score
+    return board.num_tiles[player] - board.num_tiles[1 - player]
 
 
 def reach_corner(board, player):
     """
     Heuristic function that returns a score for a move based on how close it is
-    to a corner. A move that is closer to a corner gets a higher score.
+    to a corner: its distances to all four corners summed. That sum is the same,
+    4 * (n - 1), for every square of nxn board, so it is counted from the size
+    of the board and not from board.move. Heuristics used with a transposition
+    table may depend on the position only (board.move is not in the hash).
 
     Parameters:
     - board (Board)     : the current board
@@ -32,12 +28,8 @@ def reach_corner(board, player):
     Returns:
     - score (int)       : the score for the move
     """
-    corners = [(0, 0), (0, board.n - 1), (board.n - 1, 0), (board.n - 1, board.n - 1)]
-    score = 0
-    for corner in corners:
-        dist = abs(board.move[0] - corner[0]) + abs(board.move[1] - corner[1])
-        score += dist
-    return score
+    # |row| + |n-1-row| = n - 1 and the same for the column, twice each over the four corners
+    return 4 * (board.n - 1)
 
 
 def tiles_and_corners(board, player):
@@ -0,0 +1,92 @@
+"""
+This module contains the move ordering used by alfa_beta.
+Moves likely to cut the search off are tried first: the best move from the
+transposition table, then corners, then killer moves (which cut off other
+positions with the same number of tiles) and moves with the best history
+(depth^2 summed over their cut-offs), X-squares (next to a corner on the
+diagonal) last.
+"""
+
+# Classes of squares, higher ones are searched first
+CORNER = 2
+NORMAL = 1
+X_SQUARE = 0
+
+KILLERS = 2
+
+
+def square_classes(n):
+    """ Function square_classes
+        Parameters: n (integer)
+        Returns: a dictionary of (row, col) of every square of nxn board to
+                 its class (CORNER, NORMAL or X_SQUARE)
+    """
+    classes = {(row, col): NORMAL for row in range(n) for col in range(n)}
+    for row, d_row in ((0, 1), (n - 1, -1)):
+        for col, d_col in ((0, 1), (n - 1, -1)):
+            if n > 2:
+                classes[(row + d_row, col + d_col)] = X_SQUARE
+            classes[(row, col)] = CORNER
+    return classes
+
+
+class MoveOrdering:
+    """ MoveOrdering class.
+        Attributes: classes, a dictionary of squares to their class
+                    killers, a list (for every number of tiles on the board)
+                    of lists of up to KILLERS moves
+                    history, a list of two dictionaries (one for every
+                    player) of moves to their history score
+        Methods: order, cutoff, new_search
+    """
+
+    def __init__(self, n):
+        """
+            Initializes the attributes for nxn board.
+        """
+        self.classes = square_classes(n)
+        self.killers = [[] for _ in range(n * n + 1)]
+        self.history = [{}, {}]
+
+    def order(self, moves, player, ply, first_move=None):
+        """ Method: order
+            Parameters: self, moves (list), player (0 or 1), ply (integer,
+                        number of tiles on the board), first_move (tuple)
+            Returns: a list of the moves in order to search them
+        """
+        killers = self.killers[ply]
+        history = self.history[player]
+
+        def priority(move):
+            if move == ():
+                return 0, 0, 0, 0
+            return (move == first_move, self.classes[move], move in killers, history.get(move, 0))
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def cutoff(self, move, player, ply, depth):
+        """ Method: cutoff
+            Parameters: self, move (tuple), player (0 or 1), ply (integer),
+                        depth (integer)
+            Returns: nothing
+            Does: Remembers the move which cut the search off as a killer of
+                  the ply and adds depth^2 to its history.
+        """
+        if move == ():
+            return
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[KILLERS:]
+        self.history[player][move] = self.history[player].get(move, 0) + depth * depth
+
+    def new_search(self):
+        """ Method: new_search
+            Parameters: self
+            Returns: nothing
+            Does: Halves the history scores, so the recent cut-offs count
+                  more than the ones from the moves before.
+        """
+        for history in self.history:
+            for move in history:
+                history[move] //= 2
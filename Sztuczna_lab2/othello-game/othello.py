@@ -1,13 +1,14 @@
-import copy
 import random
-import time
 
 import score
 import turtle
 
-from algorithms import min_max, alfa_beta
+import bitboard
+from algorithms import min_max, iterative_deepening
 from board import Board
 from heuristics import more_tiles, reach_corner, tiles_and_corners
+from ordering import MoveOrdering
+from transposition import TranspositionTable
 
 # Define all the possible directions in which a player's move can flip 
 # their adversary's tiles as constant (0 – the current row/column, 
@@ -15,7 +16,8 @@ from heuristics import more_tiles, reach_corner, tiles_and_corners
 MOVE_DIRS = [(-1, -1), (-1, 0), (-1, +1),
              (0, -1), (0, +1),
              (+1, -1), (+1, 0), (+1, +1)]
-DEPTH = 3
+# Time for the computer's move [s], searched as deep as it allows
+TIME_LIMIT = 1.0
 
 
 class Othello(Board):
@@ -24,13 +26,23 @@ class Othello(Board):
                     different players (the user and the computer)
                     num_tiles, a list of integers for number of tiles each
                     player has
+                    tiles, a list of two integers (bitboards) with bits
+                    of the squares taken by each player set
+                    geometry, a bitboard.Geometry of the nxn board
+                    key, an integer for Zobrist hash of the tiles
+                    table, a TranspositionTable of the computer's searches
+                    ordering, a MoveOrdering of the computer's searches
                     n, an integer for nxn board
-                    all other attributes inherited from class Board
+                    all other attributes inherited from class Board,
+                    board is built from tiles whenever it is read
         n (integer) is optional in the __init__ function
         current_player, num_tiles and all other inherited attributes
         are not taken in the __init__
 
-        Methods: initialize_board, make_move, flip_tiles, has_tile_to_flip,
+        Methods: initialize_board, make_move, make_move_without_drawing,
+                 do_move, undo_move, flip_tiles, flip_tiles_without_drawing,
+                 get_tile_flips, square, get_flips,
+                 place_tile, put_flips, has_tile_to_flip, get_legal_squares,
                  has_legal_move, get_legal_moves, is_legal_move,
                  is_valid_coord, run, play, make_random_move,
                  report_result, __str__ , __eq__ and all other methods
@@ -45,6 +57,32 @@ class Othello(Board):
         Board.__init__(self, n)
         self.current_player = 0
         self.num_tiles = [2, 2]
+        self.table = TranspositionTable()
+        self.ordering = MoveOrdering(n)
+
+    @property
+    def board(self):
+        """
+            State of the board as a nested list (0 for no tile, 1 for black
+            tiles and 2 for white tiles), built from the bitboards. Changing
+            the returned list does not change the game; assign a whole new
+            nested list instead.
+        """
+        rows = [[0] * self.n for _ in range(self.n)]
+        for player in (0, 1):
+            for row, col in bitboard.squares(self.tiles[player], self.n):
+                rows[row][col] = player + 1
+        return rows
+
+    @board.setter
+    def board(self, rows):
+        self.geometry = bitboard.geometry(self.n)
+        self.tiles = [0, 0]
+        for row in range(self.n):
+            for col in range(self.n):
+                if rows[row][col] in (1, 2):
+                    self.tiles[rows[row][col] - 1] |= 1 << (row * self.n + col)
+        self.key = bitboard.zobrist(self.geometry, self.tiles)
 
     def initialize_board(self):
         """ Method: initialize_board
@@ -65,8 +103,9 @@ class Othello(Board):
             color = i % 2
             row = initial_squares[i][0]
             col = initial_squares[i][1]
-            self.board[row][col] = color + 1
+            self.tiles[color] |= 1 << (row * self.n + col)
             self.draw_tile(initial_squares[i], color)
+        self.key = bitboard.zobrist(self.geometry, self.tiles)
 
     def make_move(self):
         """ Method: make_move
@@ -78,11 +117,13 @@ class Othello(Board):
                   tiles), and increases the number of tiles of the current
                   player by 1.
         """
-        if self.is_legal_move(self.move):
-            self.board[self.move[0]][self.move[1]] = self.current_player + 1
-            self.num_tiles[self.current_player] += 1
+        flipped = self.get_flips(self.move)
+        if flipped:
+            self.place_tile(self.move)
             self.draw_tile(self.move, self.current_player)
-            self.flip_tiles()
+            self.put_flips(flipped)
+            for square in bitboard.squares(flipped, self.n):
+                self.draw_tile(square, self.current_player)
 
     def make_move_without_drawing(self):
         """ Method: make_mov_without_drawing
@@ -94,10 +135,51 @@ class Othello(Board):
                   tiles), and increases the number of tiles of the current
                   player by 1.
         """
-        if self.is_legal_move(self.move):
-            self.board[self.move[0]][self.move[1]] = self.current_player + 1
-            self.num_tiles[self.current_player] += 1
-            self.flip_tiles_without_drawing()
+        flipped = self.get_flips(self.move)
+        if flipped:
+            self.place_tile(self.move)
+            self.put_flips(flipped)
+
+    def do_move(self, move):
+        """ Method: do_move
+            Parameters: self, move (tuple, () to pass the turn)
+            Returns: a tuple (move, flipped tiles, previous move, player)
+                     to give back to undo_move
+            Does: Makes the current player's legal move without drawing
+                  (a pass makes no move) and switches to the other player.
+                  Search algorithms use it with undo_move on the game
+                  itself instead of a copy of it.
+        """
+        record = (move, 0, self.move, self.current_player)
+        if move != ():
+            flipped = self.get_flips(move)
+            record = (move, flipped, self.move, self.current_player)
+            self.place_tile(move)
+            self.put_flips(flipped)
+            self.move = move
+        self.current_player = 1 - self.current_player
+        return record
+
+    def undo_move(self, record):
+        """ Method: undo_move
+            Parameters: self, record (tuple returned by do_move)
+            Returns: nothing
+            Does: Takes back the move made by do_move: gives the flipped
+                  tiles back to the adversary, removes the tile of the move
+                  and restores the number of tiles, the hash, the current
+                  player and the previous move.
+        """
+        move, flipped, previous, player = record
+        self.current_player = player
+        if move != ():
+            count = flipped.bit_count()
+            self.tiles[player] &= ~(flipped | self.square(move))
+            self.tiles[1 - player] |= flipped
+            self.num_tiles[player] -= count + 1
+            self.num_tiles[1 - player] += count
+            self.key ^= bitboard.flip_key(self.geometry, flipped) ^ \
+                self.geometry.keys[player][move[0] * self.n + move[1]]
+        self.move = previous
 
     def flip_tiles(self):
         """ Method: flip_tiles
@@ -107,23 +189,13 @@ class Othello(Board):
                   updates the state of the board (1 for black tiles and
                   2 for white tiles), increases the number of tiles of
                   the current player by 1, and decreases the number of
-                  tiles of the adversary by 1.
+                  tiles of the adversary by 1. The tile of the move may
+                  already be on the board.
         """
-        curr_tile = self.current_player + 1
-        for direction in MOVE_DIRS:
-            if self.has_tile_to_flip(self.move, direction):
-                i = 1
-                while True:
-                    row = self.move[0] + direction[0] * i
-                    col = self.move[1] + direction[1] * i
-                    if self.board[row][col] == curr_tile:
-                        break
-                    else:
-                        self.board[row][col] = curr_tile
-                        self.num_tiles[self.current_player] += 1
-                        self.num_tiles[(self.current_player + 1) % 2] -= 1
-                        self.draw_tile((row, col), self.current_player)
-                        i += 1
+        flipped = self.get_tile_flips(self.move)
+        self.put_flips(flipped)
+        for square in bitboard.squares(flipped, self.n):
+            self.draw_tile(square, self.current_player)
 
     def flip_tiles_without_drawing(self):
         """ Method: flip_tiles_without_drawing
@@ -133,22 +205,67 @@ class Othello(Board):
                   updates the state of the board (1 for black tiles and
                   2 for white tiles), increases the number of tiles of
                   the current player by 1, and decreases the number of
-                  tiles of the adversary by 1.
+                  tiles of the adversary by 1. The tile of the move may
+                  already be on the board.
+        """
+        self.put_flips(self.get_tile_flips(self.move))
+
+    def get_tile_flips(self, move):
+        """ Method: get_tile_flips
+            Parameters: self, move (tuple)
+            Returns: an integer with bits of the adversary's tiles a tile of
+                     the current player on the square of the move flips,
+                     whether the tile is already there or not
+        """
+        if move == () or self.current_player not in (0, 1) or \
+                not self.is_valid_coord(move[0], move[1]):
+            return 0
+        return bitboard.flips(self.geometry, self.tiles[self.current_player],
+                              self.tiles[1 - self.current_player], self.square(move))
+
+    def square(self, move):
+        """ Method: square
+            Parameters: self, move (tuple)
+            Returns: an integer with the bit of the (row, col) square set
+        """
+        return 1 << (move[0] * self.n + move[1])
+
+    def get_flips(self, move):
+        """ Method: get_flips
+            Parameters: self, move (tuple)
+            Returns: an integer with bits of the adversary's tiles the current
+                     player flips with the move (0 if the move is not legal)
+        """
+        if move == () or not self.is_valid_coord(move[0], move[1]) or \
+                (self.tiles[0] | self.tiles[1]) & self.square(move):
+            return 0
+        return self.get_tile_flips(move)
+
+    def place_tile(self, move):
+        """ Method: place_tile
+            Parameters: self, move (tuple)
+            Returns: nothing
+            Does: Puts a tile of the current player on the square of the
+                  move, updates the number of tiles and the hash.
         """
-        curr_tile = self.current_player + 1
-        for direction in MOVE_DIRS:
-            if self.has_tile_to_flip(self.move, direction):
-                i = 1
-                while True:
-                    row = self.move[0] + direction[0] * i
-                    col = self.move[1] + direction[1] * i
-                    if self.board[row][col] == curr_tile:
-                        break
-                    else:
-                        self.board[row][col] = curr_tile
-                        self.num_tiles[self.current_player] += 1
-                        self.num_tiles[(self.current_player + 1) % 2] -= 1
-                        i += 1
+        self.tiles[self.current_player] |= self.square(move)
+        self.num_tiles[self.current_player] += 1
+        self.key ^= self.geometry.keys[self.current_player][move[0] * self.n + move[1]]
+
+    def put_flips(self, flipped):
+        """ Method: put_flips
+            Parameters: self, flipped (integer)
+            Returns: nothing
+            Does: Gives the adversary's tiles with bits set in flipped to
+                  the current player and updates the number of tiles and
+                  the hash.
+        """
+        count = flipped.bit_count()
+        self.tiles[self.current_player] |= flipped
+        self.tiles[1 - self.current_player] &= ~flipped
+        self.num_tiles[self.current_player] += count
+        self.num_tiles[1 - self.current_player] -= count
+        self.key ^= bitboard.flip_key(self.geometry, flipped)
 
     def has_tile_to_flip(self, move, direction):
         """ Method: has_tile_to_flip
@@ -166,19 +283,33 @@ class Othello(Board):
         i = 1
         if self.current_player in (0, 1) and \
                 self.is_valid_coord(move[0], move[1]):
-            curr_tile = self.current_player + 1
+            own = self.tiles[self.current_player]
+            opp = self.tiles[1 - self.current_player]
             while True:
                 row = move[0] + direction[0] * i
                 col = move[1] + direction[1] * i
-                if not self.is_valid_coord(row, col) or \
-                        self.board[row][col] == 0:
+                if not self.is_valid_coord(row, col):
                     return False
-                elif self.board[row][col] == curr_tile:
+                square = self.square((row, col))
+                if own & square:
                     break
+                elif not opp & square:
+                    return False
                 else:
                     i += 1
         return i > 1
 
+    def get_legal_squares(self):
+        """ Method: get_legal_squares
+            Parameters: self
+            Returns: an integer with bits of all the legal moves of the
+                     current player set
+        """
+        if self.current_player not in (0, 1):
+            return 0
+        return bitboard.legal_moves(self.geometry, self.tiles[self.current_player],
+                                    self.tiles[1 - self.current_player])
+
     def has_legal_move(self):
         """ Method: has_legal_move
             Parameters: self
@@ -187,27 +318,17 @@ class Othello(Board):
             Does: Checks whether the current player has any legal move
                   to make.
         """
-        for row in range(self.n):
-            for col in range(self.n):
-                move = (row, col)
-                if self.is_legal_move(move):
-                    return True
-        return False
+        return self.get_legal_squares() != 0
 
     def get_legal_moves(self):
         """ Method: get_legal_moves
             Parameters: self
             Returns: a list of legal moves that can be made
             Does: Finds all the legal moves the current player can make.
-                  Every move is a tuple of coordinates (row, col).
+                  Every move is a tuple of coordinates (row, col), moves
+                  are in row-major order.
         """
-        moves = []
-        for row in range(self.n):
-            for col in range(self.n):
-                move = (row, col)
-                if self.is_legal_move(move):
-                    moves.append(move)
-        return moves
+        return bitboard.squares(self.get_legal_squares(), self.n)
 
     def is_legal_move(self, move):
         """ Method: is_legal_move
@@ -217,11 +338,7 @@ class Othello(Board):
 
                   About input: move is a tuple of coordinates (row, col).
         """
-        if move != () and self.is_valid_coord(move[0], move[1]) and self.board[move[0]][move[1]] == 0:
-            for direction in MOVE_DIRS:
-                if self.has_tile_to_flip(move, direction):
-                    return True
-        return False
+        return self.get_flips(move) != 0
 
     def is_valid_coord(self, row, col):
         """ Method: is_valid_coord
@@ -283,22 +400,25 @@ class Othello(Board):
             self.current_player = 1
             if self.has_legal_move():
                 print('Computer\'s thinking...')
-                time.sleep(1)
 
                 # Min Max algorithm
                 # best_move, best_score, amount_of_nodes = min_max(
-                #     copy.deepcopy(self), self.current_player, DEPTH, tiles_and_corners
+                #     self, self.current_player, 3, tiles_and_corners
                 # )
 
-                # Alfa Beta algorithm
-                best_move, best_score, amount_of_nodes = alfa_beta(
-                        copy.deepcopy(self), self.current_player, DEPTH, tiles_and_corners
+                # Alfa Beta algorithm deepened until TIME_LIMIT, leaves the game as it was
+                self.table.new_search()
+                self.ordering.new_search()
+                best_move, best_score, depth, amount_of_nodes = iterative_deepening(
+                        self, self.current_player, tiles_and_corners, TIME_LIMIT, table=self.table,
+                        ordering=self.ordering
                 )
 
                 self.move = best_move
                 tiles_nodes = 'Nodes searched: ' + str(amount_of_nodes) + "; Tiles on board: " + str(
-                    self.num_tiles[0] + self.num_tiles[1] + 1)
+                    self.num_tiles[0] + self.num_tiles[1] + 1) + '; Depth: ' + str(depth)
                 print(tiles_nodes)
+                print('Transposition table: ' + str(self.table))
 
                 # self.make_random_move()
                 self.make_move()
@@ -0,0 +1,152 @@
+"""
+This module contains tests of the Othello class, python -m pytest
+(no turtle window is opened, drawing is switched off in every game).
+"""
+
+import random
+
+import othello
+from algorithms import alfa_beta, get_moves, iterative_deepening, min_max
+from heuristics import more_tiles, reach_corner, tiles_and_corners
+from transposition import TranspositionTable
+
+MOVE_DIRS = othello.MOVE_DIRS
+
+
+def new_game(n=8):
+    """ Function new_game
+        Parameters: n (integer)
+        Returns: an Othello game in the opening position, without drawing
+    """
+    game = othello.Othello(n)
+    game.draw_tile = lambda move, player: None
+    rows = [[0] * n for _ in range(n)]
+    rows[n // 2 - 1][n // 2 - 1] = rows[n // 2][n // 2] = 2
+    rows[n // 2 - 1][n // 2] = rows[n // 2][n // 2 - 1] = 1
+    game.board = rows
+    game.move = (n // 2 - 1, n // 2)
+    return game
+
+
+def naive_flips(rows, player, move):
+    """ Function naive_flips
+        Parameters: rows (nested list), player (0 or 1), move (tuple)
+        Returns: a set of (row, col) squares flipped by the move, walking
+                 the nested list like the game did before the bitboards
+    """
+    n = len(rows)
+    if rows[move[0]][move[1]] != 0:
+        return set()
+    flipped = set()
+    for d_row, d_col in MOVE_DIRS:
+        run = []
+        row, col = move[0] + d_row, move[1] + d_col
+        while 0 <= row < n and 0 <= col < n and rows[row][col] == 2 - player:
+            run.append((row, col))
+            row, col = row + d_row, col + d_col
+        if run and 0 <= row < n and 0 <= col < n and rows[row][col] == player + 1:
+            flipped.update(run)
+    return flipped
+
+
+def random_position(seed, moves):
+    game = new_game()
+    rng = random.Random(seed)
+    for _ in range(moves):
+        legal = get_moves(game)
+        if not legal:
+            break
+        game.do_move(rng.choice(legal))
+    return game
+
+
+def test_make_move_flips_tiles():
+    game = new_game()
+    game.move = (2, 3)
+    game.make_move()
+    assert game.board[3][3] == 1
+    assert game.num_tiles == [4, 1]
+
+
+def test_flip_tiles_after_the_tile_is_placed():
+    game = new_game()
+    game.move = (2, 3)
+    game.place_tile(game.move)
+    game.flip_tiles_without_drawing()
+    assert game.board[3][3] == 1
+    assert game.num_tiles == [4, 1]
+
+
+def test_moves_match_the_nested_list_rules():
+    for seed in range(30):
+        game = new_game()
+        rng = random.Random(seed)
+        while True:
+            rows = game.board
+            expected = {}
+            for row in range(game.n):
+                for col in range(game.n):
+                    flipped = naive_flips(rows, game.current_player, (row, col))
+                    if flipped:
+                        expected[(row, col)] = flipped
+            assert game.get_legal_moves() == sorted(expected)
+            if not expected:
+                game.current_player = 1 - game.current_player
+                if not game.has_legal_move():
+                    break
+                continue
+
+            game.move = rng.choice(sorted(expected))
+            game.make_move()
+            rows[game.move[0]][game.move[1]] = game.current_player + 1
+            for row, col in expected[game.move]:
+                rows[row][col] = game.current_player + 1
+            assert game.board == rows
+            assert game.num_tiles == [sum(r.count(1) for r in rows), sum(r.count(2) for r in rows)]
+            game.current_player = 1 - game.current_player
+
+
+def test_undo_move_restores_the_game():
+    game = random_position(1, 20)
+    state = (game.board, list(game.num_tiles), game.current_player, game.move, game.key)
+    for move in get_moves(game):
+        undo = game.do_move(move)
+        game.undo_move(undo)
+        assert (game.board, list(game.num_tiles), game.current_player, game.move, game.key) == state
+
+
+def test_searches_leave_the_game_as_it_was():
+    for seed in range(5):
+        game = random_position(seed, 10 + seed * 8)
+        if not game.has_legal_move():
+            continue
+        state = (game.board, list(game.num_tiles), game.current_player, game.move, game.key)
+        player = game.current_player
+        score = min_max(game, player, 3, more_tiles)[1]
+        assert alfa_beta(game, player, 3, more_tiles)[1] == score
+        iterative_deepening(game, player, tiles_and_corners, 0.05)
+        assert (game.board, list(game.num_tiles), game.current_player, game.move, game.key) == state
+
+
+def test_heuristics_depend_on_the_position_only():
+    game = random_position(2, 12)
+    scores = [tiles_and_corners(game, 0), reach_corner(game, 1)]
+    for row in range(game.n):
+        for col in range(game.n):
+            game.move = (row, col)
+            # the old reach_corner, distances of the last move to the corners
+            corners = [(0, 0), (0, game.n - 1), (game.n - 1, 0), (game.n - 1, game.n - 1)]
+            assert reach_corner(game, 1) == sum(abs(row - r) + abs(col - c) for r, c in corners)
+            assert [tiles_and_corners(game, 0), reach_corner(game, 1)] == scores
+
+
+def test_transposition_table_keeps_the_scores():
+    for seed in range(5):
+        game = random_position(seed, 8 + seed * 6)
+        if not game.has_legal_move():
+            continue
+        player = game.current_player
+        table = TranspositionTable()
+        for depth in range(1, 5):
+            score = alfa_beta(game, player, depth, tiles_and_corners)[1]
+            assert alfa_beta(game, player, depth, tiles_and_corners, table=table)[1] == score
@@ -0,0 +1,101 @@
+"""
+This module contains the transposition table used by alfa_beta.
+Positions are found by their Zobrist hash (see bitboard.zobrist), the same
+position reached by another order of moves is not searched again.
+"""
+
+# Kinds of stored scores
+EXACT = 0
+LOWER = 1   # the score is at least the stored one (beta cut-off)
+UPPER = 2   # the score is at most the stored one (no move reached alpha)
+
+
+class TranspositionTable:
+    """ TranspositionTable class.
+        Attributes: size, an integer (a power of two) for number of entries
+                    entries, a list of size entries, every one None or a tuple
+                    (key, depth, flag, score, move, generation)
+                    generation, an integer for number of searches started
+                    probes, hits, cutoffs, stores, overwrites, integers
+                    counting lookups, lookups finding the position, lookups
+                    ending the search of the position, entries stored and
+                    entries of other positions replaced
+        Methods: new_search, probe, store, hit_rate, clear, __str__
+
+        A table holds scores for one player and one heuristic.
+    """
+
+    def __init__(self, size=1 << 16):
+        """
+            Initializes the attributes, size is rounded down to a power of two.
+        """
+        self.size = 1 << (max(size, 1).bit_length() - 1)
+        self.clear()
+
+    def clear(self):
+        """ Method: clear
+            Parameters: self
+            Returns: nothing
+            Does: Removes all the entries and resets the counters.
+        """
+        self.entries = [None] * self.size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.cutoffs = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def new_search(self):
+        """ Method: new_search
+            Parameters: self
+            Returns: nothing
+            Does: Marks entries stored so far as old, so they are the first
+                  ones to be replaced.
+        """
+        self.generation += 1
+
+    def probe(self, key):
+        """ Method: probe
+            Parameters: self, key (integer)
+            Returns: the entry tuple of the position, None if it is not stored
+        """
+        self.probes += 1
+        entry = self.entries[key & (self.size - 1)]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        """ Method: store
+            Parameters: self, key (integer), depth (integer), flag (EXACT,
+                        LOWER or UPPER), score (number), move (tuple)
+            Returns: nothing
+            Does: Saves the result of a search of the position. The entry in
+                  its slot is replaced if it is of the same position, from
+                  an older search or not searched deeper.
+        """
+        index = key & (self.size - 1)
+        entry = self.entries[index]
+        if entry is not None and entry[0] != key:
+            if entry[5] == self.generation and entry[1] > depth:
+                return
+            self.overwrites += 1
+        self.entries[index] = (key, depth, flag, score, move, self.generation)
+        self.stores += 1
+
+    def hit_rate(self):
+        """ Method: hit_rate
+            Parameters: self
+            Returns: the part of probes which found the position (0 if none)
+        """
+        return self.hits / self.probes if self.probes else 0
+
+    def __str__(self):
+        """
+            Returns the counters to print.
+        """
+        return 'Probes: %d; Hits: %d (%.1f%%); Cut-offs: %d; Stores: %d; Overwrites: %d' % (
+            self.probes, self.hits, 100 * self.hit_rate(), self.cutoffs, self.stores, self.overwrites
+        )